@@ -0,0 +1,74 @@
+import argparse
+import os
+import tempfile
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+
+import numpy as np
+import pandas as pd
+
+from common import fmt_row, load_scraper, timed
+from mock_upstream import MockUpstream
+
+# the per-host limiter against a mock that throttles: FPDS enrichment with the rate pinned too high vs
+# adaptive, then checks that Retry-After pauses the host, the in-flight cap holds, and rising latency
+# pulls the rate down. with adapting on, every row has to come back despite the 429s
+def enrich(ds,srv,n_rows,workers,limits,rate=(80.,8)):
+    ds.host_limiters.clear()
+    ds.HOST_RATES[srv.netloc] = rate
+    ds.HOST_LIMITS[srv.netloc] = limits
+    srv.reset_log()
+    contract_df = pd.DataFrame({'fpds_link': ['{}/fpds/PIID{}'.format(srv.root,i) for i in range(n_rows)]})
+    t, out = timed(ds.extend_contract_data,contract_df,'bench',max_workers=workers)
+    ok = (out.award_procurement_id == ['PIID{}'.format(i) for i in range(n_rows)]).values
+    return t, ds.host_limiters[srv.netloc], ok.sum()
+
+def main():
+    parser = argparse.ArgumentParser(description='adaptive per-host limiter against a throttling server')
+    parser.add_argument('--rows',type=int,default=200)
+    parser.add_argument('--server-rate',type=int,default=20,help='requests per second the mock accepts')
+    parser.add_argument('--workers',type=int,default=8)
+    args = parser.parse_args()
+    ds = load_scraper()
+    ds.tqdm = lambda x, **kw: x
+    ds.BACKOFF_S = 0.25
+    os.chdir(tempfile.mkdtemp())
+
+    assert ds.parse_retry_after('3') == 3. and ds.parse_retry_after(None) is None and ds.parse_retry_after('soon') is None
+    assert 8 < ds.parse_retry_after(format_datetime(datetime.now(timezone.utc) + timedelta(seconds=10),usegmt=True)) <= 10
+    assert ds.parse_retry_after('99999') == ds.MAX_RETRY_AFTER_S
+
+    srv = MockUpstream(ds.data_key_dict,latency=0.01,throttle_rate=args.server_rate).start()
+    print('server accepts {} req/s, client starts at 80 req/s'.format(args.server_rate))
+    print(fmt_row('limiter','seconds','rows ok','rows/s','429s','final rate'))
+    for label, limits in [('fixed',{'min_rate': 80.,'max_rate': 80.}),('adaptive',{'min_rate': 1.,'max_rate': 80.})]:
+        t, limiter, n_ok = enrich(ds,srv,args.rows,args.workers,limits)
+        print(fmt_row(label,f'{t:.2f}',n_ok,f'{n_ok / t:.1f}',len(srv.throttle_log),f'{limiter.rate:.1f}'))
+        if label == 'fixed':
+            fixed_429s = len(srv.throttle_log)
+    assert n_ok == args.rows, 'rows lost with adapting on'
+    assert len(srv.throttle_log) < fixed_429s / 2, 'adapting did not cut the 429s'
+
+    # Retry-After: once a 429 says wait 1s, nothing else reaches the host until it is up
+    srv.retry_after = 1
+    enrich(ds,srv,60,args.workers,{'min_rate': 1.,'max_rate': 80.})
+    first = srv.throttle_log[0]
+    arrivals = np.array([t for t, _ in srv.request_log])
+    during = ((arrivals > first + 0.1) & (arrivals < first + 0.9)).sum()
+    print('requests inside the first 1s Retry-After pause: {}'.format(during))
+    assert during == 0
+    srv.retry_after = None
+    srv.throttle_rate = None
+
+    # in-flight cap, with a server that slows as concurrency rises
+    srv.latency, srv.slow_per_inflight = 0.05,0.02
+    enrich(ds,srv,100,16,{'max_inflight': 4},rate=(1000.,1000))
+    print('16 workers, cap 4: max {} in flight at the server'.format(srv.max_inflight))
+    assert srv.max_inflight <= 4
+    _, limiter, _ = enrich(ds,srv,100,16,{'latency_target': 0.1},rate=(50.,10))
+    print('latency target 0.1s under load: rate 50 -> {:.1f} req/s'.format(limiter.rate))
+    assert limiter.rate < 50
+    srv.stop()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,85 @@
+import argparse
+import os
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+from common import fmt_row, load_scraper, timed
+from mock_upstream import MockUpstream
+from synth import synth_savings_records
+
+# daily runs against the mock upstream with the csv history vs the cdc event log. each day some records
+# are new, some edited and some removed upstream. checks the cdc current state follows the listing,
+# each day's events part holds just that day's changes, and as-of queries and history exports give back
+# earlier days
+def dir_bytes(path):
+    return sum(os.path.getsize(os.path.join(r,f)) for r, _, fs in os.walk(path) for f in fs)
+
+def next_day(listing,day,frac_new,frac_edit,frac_drop,root):
+    rng = np.random.default_rng(day)
+    out = {}
+    for endpoint, records in listing.items():
+        new = synth_savings_records(endpoint,max(int(len(records) * frac_new),1),seed=100 + day,fpds_root=root)
+        for i, record in enumerate(new):
+            key = {'contracts': 'piid','grants': 'link','leases': 'location'}[endpoint]
+            record[key] = '{}-d{}-{}'.format(record[key],day,i)
+            if endpoint == 'contracts':
+                record['fpds_link'] = '{}/fpds/{}'.format(root,record['piid'])
+        kept = [dict(r) for r in records if rng.random() >= frac_drop]
+        for record in kept:
+            if rng.random() < frac_edit:
+                record['savings'] += 1
+        out[endpoint] = new + kept
+    return out
+
+def main():
+    parser = argparse.ArgumentParser(description='csv history vs cdc event log over several daily runs')
+    parser.add_argument('--records',type=int,default=2000)
+    parser.add_argument('--days',type=int,default=3)
+    args = parser.parse_args()
+    ds = load_scraper()
+    ds.tqdm = lambda x, **kw: x
+    srv = MockUpstream(ds.data_key_dict).start()
+    ds.HOST_RATES[srv.netloc] = (1000.,1000)
+    ds.DOGE_API_ROOT, ds.USAS_API_ROOT = srv.savings_root, srv.usas_root
+    days = [{endpoint: synth_savings_records(endpoint,args.records,fpds_root=srv.root) for endpoint in ['contracts','grants','leases']}]
+    for day in range(1,args.days):
+        days.append(next_day(days[-1],day,0.03,0.02,0.01,srv.root))
+    print(fmt_row('backend','day','seconds','requests','contract rows','MB written'))
+    for backend in ['csv','cdc']:
+        os.chdir(tempfile.mkdtemp())
+        os.makedirs('data')
+        stamps = []
+        for day, listing in enumerate(days):
+            srv.savings = listing
+            srv.reset_log()
+            size_before = dir_bytes('data')
+            t, frames = timed(ds.update_doge_data,backend=backend)
+            tag = (pd.Timestamp('2025-06-01') + pd.Timedelta(days=day)).strftime('%Y-%m-%d-%H%M')
+            stamps.append(tag)
+            for df, name in zip(frames[:3],['contract','grant','property']):
+                ds.save_table(df,name,backend,False,tag)
+            written = dir_bytes('data') - size_before if backend == 'cdc' else dir_bytes('data')
+            print(fmt_row(backend,day,f'{t:.2f}',len(srv.request_log),len(frames[0]),f'{written / 1e6:.2f}'))
+            if backend == 'cdc':
+                assert len(frames[0]) == len(listing['contracts']), 'current state does not follow the listing'
+                assert sorted(ds.cdc_current(ds.cdc_events('contract')).piid) == sorted(r['piid'] for r in listing['contracts'])
+        if backend == 'cdc':
+            events = ds.cdc_events('contract')
+            print(events.groupby([events._valid_from.dt.strftime('%Y-%m-%d'),'_op']).size().unstack(fill_value=0).to_string())
+            for day, tag in enumerate(stamps):
+                as_of = ds.cdc_current(events,as_of=ds.tag_to_dt(tag))
+                assert sorted(as_of.piid) == sorted(r['piid'] for r in days[day]['contracts']), 'as-of view differs'
+            history = ds.cdc_history(events)
+            assert history._valid_to.isna().sum() == events._key.nunique()
+            out_dir = ds.export_as_of(ds.tag_to_dt(stamps[1]))
+            exported = pd.read_csv(os.path.join(out_dir,'doge-contract-history.csv'))
+            assert len(exported) == ((events._valid_from <= ds.tag_to_dt(stamps[1])) & (events._op != 'delete')).sum()
+            assert exported._valid_to.isna().sum() == len(pd.read_csv(os.path.join(out_dir,'doge-contract.csv')))
+            t_cur, _ = timed(ds.load_cdc,'contract',repeat=3)
+            print('current state load: {:.3f}s, as-of checks passed for {} days'.format(t_cur,len(stamps)))
+    srv.stop()
+
+if __name__ == '__main__':
+    main()
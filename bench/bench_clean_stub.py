@@ -0,0 +1,64 @@
+import argparse
+
+import numpy as np
+import pandas as pd
+
+from common import fmt_row, load_scraper, timed
+from synth import synth_grant_stub, synth_property_stub
+
+# clean_stub_df on large lease and grant stubs: the original per-cell loop vs the vectorized version.
+# both outputs must be identical, including the 2-letter-state heuristic and unparseable dates
+def legacy_clean_stub_df(ds,df):
+    df.columns = [k.lower().replace(' ','_') for k in df.keys()]
+    if 'uploaded_on' in df.keys():
+        df['uploaded_dt'] = [ds.safe_to_dt(dts) for dts in df['uploaded_on'].values]
+    if 'location' in df.keys():
+        loc_part_list = [loc.split(', ') for loc in df['location'].values]
+        for idx, loc_part_tup in enumerate(loc_part_list):
+            city_pred = len(loc_part_tup[1]) == 2
+            df.loc[idx,'city'] = loc_part_tup[0]
+            df.loc[idx,'state'] = loc_part_tup[1] if city_pred else ''
+            if len(loc_part_tup) > 2:
+                df.loc[idx,'agency'] = loc_part_tup[2] if city_pred else loc_part_tup[1]
+    if 'link' in df.keys():
+        df.link = df.link.fillna('')
+    if 'vendor' in df.keys():
+        df.loc[df.vendor == 'N/A','vendor'] = ''
+    return df
+
+def lease_stub(n):
+    df = synth_property_stub(n).rename(columns={'date': 'Uploaded On','location': 'Location'})
+    rng = np.random.default_rng(2)
+    odd = rng.random(n)
+    # some locations carry an agency, some have no state code, a few dates don't parse
+    df.loc[odd < 0.2,'Location'] = df.loc[odd < 0.2,'Location'] + ', GENERAL SERVICES ADMINISTRATION'
+    df.loc[(odd >= 0.2) & (odd < 0.25),'Location'] = 'SAN JUAN, PUERTO RICO, DEPARTMENT OF STATE'
+    df.loc[odd > 0.999,'Uploaded On'] = 'not a date'
+    return df
+
+def grant_stub(n):
+    df = synth_grant_stub(n).rename(columns={'date': 'uploaded_on'})
+    df.loc[df.index % 50 == 0,'link'] = None
+    return df
+
+def main():
+    parser = argparse.ArgumentParser(description='clean_stub_df, per-cell loop vs vectorized')
+    parser.add_argument('--sizes',type=int,nargs='+',default=[10_000,100_000,200_000])
+    parser.add_argument('--legacy-max',type=int,default=100_000,help='skip the loop above this many rows')
+    args = parser.parse_args()
+    ds = load_scraper()
+    print(fmt_row('table','rows','loop (s)','vector (s)','speedup'))
+    for label, make in [('leases',lease_stub),('grants',grant_stub)]:
+        for n in args.sizes:
+            ds.date_format_cache.clear()
+            t_new, new_df = timed(ds.clean_stub_df,make(n))
+            if n <= args.legacy_max:
+                t_old, old_df = timed(legacy_clean_stub_df,ds,make(n))
+                pd.testing.assert_frame_equal(old_df,new_df,check_dtype=False)
+                assert old_df.to_csv(index=False) == new_df.to_csv(index=False)
+                print(fmt_row(label,n,f'{t_old:.2f}',f'{t_new:.3f}',f'{t_old / t_new:.0f}x'))
+            else:
+                print(fmt_row(label,n,'-',f'{t_new:.3f}','-'))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,50 @@
+import argparse
+import os
+import tempfile
+
+from common import fmt_row, load_scraper, timed
+from mock_upstream import MockUpstream
+from synth import synth_savings_records
+
+# full scrape of a local mock of /savings/{contracts,grants,leases} with per-page latency and injected
+# 500s and truncated JSON. every run must come back with exactly the served records, in order, and the
+# api host limit must hold; throughput should scale with --doge-workers until the limit is reached
+def check_scrape(ds,srv,dfs):
+    for df, ep in zip(dfs,['contracts','grants','leases']):
+        expected = [rec['value'] for rec in srv.savings[ep]]
+        assert df['value'].tolist() == expected, '{} rows missing or out of order'.format(ep)
+
+def main():
+    parser = argparse.ArgumentParser(description='parallel DOGE pagination against a flaky mock API')
+    parser.add_argument('--pages',type=int,default=30,help='pages per endpoint')
+    parser.add_argument('--per-page',type=int,default=100)
+    parser.add_argument('--latency',type=float,default=0.2)
+    parser.add_argument('--error-rate',type=float,default=0.05)
+    parser.add_argument('--bad-json-rate',type=float,default=0.02)
+    parser.add_argument('--rate',type=float,default=20.,help='client-side api host limit, req/s')
+    parser.add_argument('--workers',type=int,nargs='+',default=[1,2,4,8,16])
+    args = parser.parse_args()
+    ds = load_scraper()
+    ds.BACKOFF_S = 0.05
+    ds.DOGE_RETRIES = 8
+    os.chdir(tempfile.mkdtemp())
+    srv = MockUpstream(ds.data_key_dict,latency=args.latency,error_rate=args.error_rate,bad_json_rate=args.bad_json_rate).start()
+    ds.DOGE_API_ROOT = srv.savings_root
+    ds.HOST_RATES[srv.netloc] = (args.rate,2)
+    for i, ep in enumerate(['contracts','grants','leases']):
+        srv.savings[ep] = synth_savings_records(ep,args.pages * args.per_page,seed=i)
+    ds.DOGE_PER_PAGE = args.per_page
+    print('{} pages x 3 endpoints, {:.0%} 500s, {:.0%} bad JSON, {} req/s limit'.format(args.pages,args.error_rate,args.bad_json_rate,args.rate))
+    print(fmt_row('workers','seconds','pages/s','requests','peak req/1s'))
+    for w in args.workers:
+        ds.host_limiters.clear()
+        srv.reset_log()
+        t, (dfs, _, _) = timed(ds.scrape_doge,False,{},w)
+        check_scrape(ds,srv,dfs)
+        peak = srv.max_window_count(1.)
+        assert peak <= args.rate + 2, 'host limit exceeded'
+        print(fmt_row(w,f'{t:.2f}',f'{3 * args.pages / t:.1f}',len(srv.request_log),peak))
+    srv.stop()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,61 @@
+import argparse
+import os
+import shutil
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+from common import fmt_row, load_scraper, measure_in_subprocess, timed
+from synth import perturb, synth_contract_history
+
+# diffing a fixed-size stub against a growing contract history loaded in full vs against the on-disk
+# fingerprint index (cold: built in one chunked pass, warm: memory-mapped as is), then saving the new rows with a full
+# rewrite vs append_table. checks all three diffs find the same rows, and that the extended index and
+# appended csv match a fresh build and a full rewrite
+def diff_full(ds,stub_df):
+    pre_df = ds.clean_pre_df(ds.load_table('contract'),'contract')
+    return ds.df_row_diff_3(pre_df,stub_df)[0]
+
+def diff_index(ds,stub_df):
+    return ds.df_row_diff_index('contract',stub_df)[0]
+
+def main():
+    parser = argparse.ArgumentParser(description='full-history diff vs the fingerprint index: time, peak RSS, append')
+    parser.add_argument('--sizes',type=int,nargs='+',default=[10_000,100_000,300_000],help='history rows')
+    parser.add_argument('--stub',type=int,default=10_000,help='listing rows, the newest of the history plus some new and edited ones')
+    args = parser.parse_args()
+    ds = load_scraper()
+    os.chdir(tempfile.mkdtemp())
+    os.makedirs('data')
+    print(fmt_row('rows','diff','seconds','peak MB','new rows'))
+    for n in args.sizes:
+        history = synth_contract_history(n,ds.data_key_dict)
+        history.to_csv('data/doge-contract.csv',index=False)
+        stub_df = perturb(history.head(args.stub)[['piid','agency','vendor','value','description_doge','fpds_status','fpds_link','savings']]).drop(columns=['uploaded_dt'])
+        stub_df.to_csv('stub.csv',index=False)
+        stub_df = ds.clean_stub_df(ds.safe_load_csv('stub.csv'),'contract')
+        shutil.rmtree('data/index',ignore_errors=True)
+        for label, fn in [('full',diff_full),('index cold',diff_index),('index warm',diff_index)]:
+            t, mb = measure_in_subprocess(fn,ds,stub_df)
+            if label == 'index cold':   # the child built it, keep going from its index like a second run would
+                assert ds.fp_index_meta('contract') is not None
+            print(fmt_row(n,label,f'{t:.2f}',f'{mb:.0f}',len(fn(ds,stub_df))))
+        assert diff_index(ds,stub_df).piid.tolist() == diff_full(ds,stub_df).piid.tolist(), 'index diff found different rows'
+
+        new_df = diff_full(ds,stub_df).assign(dt_scrape='2025-06-01-0000')
+        shutil.copy('data/doge-contract.csv','history.csv')
+        t_append, _ = timed(ds.append_table,new_df,'contract')
+        appended = pd.read_csv('data/doge-contract.csv',low_memory=False)
+        sorted_fp, order = ds.load_fp_index('contract',list(stub_df.columns))
+        extended = np.array(sorted_fp), np.array(order)
+        shutil.copy('history.csv','data/doge-contract.csv')
+        t_full, _ = timed(lambda: ds.save_table(ds.combine_tables(ds.clean_pre_df(ds.load_table('contract'),'contract'),new_df,'contract'),'contract'))
+        pd.testing.assert_frame_equal(appended,pd.read_csv('data/doge-contract.csv',low_memory=False),check_dtype=False)
+        ds.build_fp_index('contract',list(stub_df.columns))
+        sorted_fp, order = ds.load_fp_index('contract',list(stub_df.columns))
+        assert (np.array(sorted_fp) == extended[0]).all() and (np.array(order) == extended[1]).all(), 'extended index differs from a rebuild'
+        print(fmt_row(n,'save',f'full {t_full:.2f}',f'append {t_append:.2f}',len(new_df)))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,45 @@
+import argparse
+import tempfile
+import os
+
+import pandas as pd
+
+from common import fmt_row, load_scraper, timed
+from mock_upstream import MockUpstream
+
+# FPDS enrichment throughput against a local stub server with fixed per-page latency.
+# run once with a generous host limit (throughput should scale with workers) and once with a
+# tight one (throughput should flatten at the limit and the observed request rate stay under it)
+def run(ds,srv,n_rows,workers,rate,burst):
+    ds.host_limiters.clear()
+    ds.HOST_RATES[srv.netloc] = (rate,burst)
+    contract_df = pd.DataFrame({'fpds_link': ['{}/fpds/PIID{}'.format(srv.root,i) for i in range(n_rows)]})
+    srv.reset_log()
+    t, out = timed(ds.extend_contract_data,contract_df,'bench',max_workers=workers)
+    assert (out.award_procurement_id == ['PIID{}'.format(i) for i in range(n_rows)]).all(), 'rows out of order'
+    return t
+
+def main():
+    parser = argparse.ArgumentParser(description='FPDS fetch throughput vs concurrency')
+    parser.add_argument('--rows',type=int,default=60)
+    parser.add_argument('--latency',type=float,default=0.25,help='seconds per stub response')
+    parser.add_argument('--workers',type=int,nargs='+',default=[1,2,4,8,16])
+    parser.add_argument('--tight-rate',type=float,default=8.)
+    args = parser.parse_args()
+    ds = load_scraper()
+    ds.tqdm = lambda x, **kw: x
+    os.chdir(tempfile.mkdtemp())    # keep runlog/ out of the repo
+    srv = MockUpstream(ds.data_key_dict,latency=args.latency).start()
+    for label, rate, burst in [('loose',1000.,1000),('tight',args.tight_rate,2)]:
+        print('{} host limit: {} req/s, burst {}'.format(label,rate,burst))
+        print(fmt_row('workers','seconds','req/s','peak req/1s'))
+        for w in args.workers:
+            t = run(ds,srv,args.rows,w,rate,burst)
+            peak = srv.max_window_count(1.)
+            print(fmt_row(w,f'{t:.2f}',f'{args.rows / t:.1f}',peak))
+            if label == 'tight':
+                assert peak <= rate + burst, 'host limit exceeded'
+    srv.stop()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,53 @@
+import argparse
+import glob
+import os
+
+from bs4 import BeautifulSoup
+
+from common import fmt_row, load_scraper, timed
+from synth import synth_fpds_html
+
+# FPDS page parsing throughput: parse_fpds_html over a BeautifulSoup tree vs the single-pass
+# parse_fpds_content. pass --corpus with a directory of saved FPDS pages (*.html), otherwise
+# synthetic pages are used
+EDGE_PAGES = [
+    b'',
+    b'<html><body><p>no award here</p></body></html>',
+    b'<HTML><BODY><INPUT ID="PIID" VALUE="UPPER&amp;CASE"><input id="PIID" value="second"></BODY></HTML>',
+    b'<html><body><input id="obligatedAmount" value="$1,234.50"><input id="vendorName">'
+    b'<textarea id="descriptionOfContractRequirement" text="attr text">body text</textarea></body></html>',
+    '<html><head><meta charset="utf-8"></head><body><input id="vendorName" value="CAFÉ S.A."></body></html>'.encode(),
+    '<html><body><input id="vendorName" value="Café S.A."></body></html>'.encode(),   # no declared charset
+    '<html><body><input id="vendorName" value="Café S.A."></body></html>'.encode('cp1252'),
+    '\ufeff<html><body><input id="vendorName" value="Ünïcode GmbH"></body></html>'.encode('utf-16'),
+]
+
+def load_corpus(ds,corpus_dir,n):
+    if corpus_dir:
+        pages = []
+        for fp in sorted(glob.glob(os.path.join(corpus_dir,'*.html'))):
+            with open(fp,'rb') as f:
+                pages.append(f.read())
+        return pages
+    return [synth_fpds_html('PIID{}'.format(i),ds.data_key_dict) for i in range(n)]
+
+def main():
+    parser = argparse.ArgumentParser(description='FPDS page parse throughput')
+    parser.add_argument('--corpus',default=None,help='directory of saved FPDS pages')
+    parser.add_argument('--pages',type=int,default=200,help='synthetic pages when no corpus is given')
+    args = parser.parse_args()
+    ds = load_scraper()
+    pages = load_corpus(ds,args.corpus,args.pages)
+    for page in EDGE_PAGES + pages:
+        assert ds.parse_fpds_content(page) == ds.parse_fpds_html(BeautifulSoup(page,features='lxml')), page[:80]
+    mb = sum(len(p) for p in pages) / 1e6
+    t_soup, _ = timed(lambda: [ds.parse_fpds_html(BeautifulSoup(p,features='lxml')) for p in pages])
+    t_fast, _ = timed(lambda: [ds.parse_fpds_content(p) for p in pages],repeat=3)
+    print('{} pages, {:.1f} MB'.format(len(pages),mb))
+    print(fmt_row('parser','pages/s','MB/s'))
+    print(fmt_row('soup',f'{len(pages) / t_soup:.0f}',f'{mb / t_soup:.1f}'))
+    print(fmt_row('single-pass',f'{len(pages) / t_fast:.0f}',f'{mb / t_fast:.1f}'))
+    print('speedup: {:.0f}x'.format(t_soup / t_fast))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,46 @@
+import argparse
+import os
+import tempfile
+
+import pandas as pd
+import requests as req
+
+from common import fmt_row, load_scraper, timed
+from mock_upstream import MockUpstream
+
+# grant enrichment against a local mock of /api/v2/awards/: the original one-bare-requests.get-per-grant
+# loop vs pooled keep-alive sessions with 1..N workers. reports TCP connections opened and requests/s
+def legacy_extend_grant_data(ds,grant_df):
+    usas_df = pd.DataFrame([])
+    rh = req.utils.default_headers()
+    for link in grant_df.link.values:
+        r = req.get(os.path.join(ds.USAS_API_ROOT,os.path.basename(link)),headers=rh)
+        grant_row_df = pd.json_normalize(r.json(),sep='_').rename(columns={'description': 'description_usas'})
+        usas_df = pd.concat([usas_df,grant_row_df],ignore_index=True)
+    return pd.concat([grant_df.reset_index().drop('index',axis=1),usas_df],axis=1)
+
+def main():
+    parser = argparse.ArgumentParser(description='USASpending award lookups: connection reuse and throughput')
+    parser.add_argument('--grants',type=int,default=300)
+    parser.add_argument('--latency',type=float,default=0.02)
+    parser.add_argument('--workers',type=int,nargs='+',default=[1,4,8])
+    args = parser.parse_args()
+    ds = load_scraper()
+    ds.tqdm = lambda x, **kw: x
+    os.chdir(tempfile.mkdtemp())
+    srv = MockUpstream(ds.data_key_dict,latency=args.latency).start()
+    ds.HOST_RATES[srv.netloc] = (1000.,1000)    # the api's 10 req/3s limit would swamp the comparison
+    ds.USAS_API_ROOT = srv.usas_root
+    grant_df = pd.DataFrame({'link': ['https://www.usaspending.gov/award/ASST_NON_{}'.format(i) for i in range(args.grants)]})
+    t, legacy_df = timed(legacy_extend_grant_data,ds,grant_df)
+    print(fmt_row('client','seconds','req/s','connections'))
+    print(fmt_row('bare get',f'{t:.2f}',f'{args.grants / t:.0f}',srv.connections))
+    for w in args.workers:
+        srv.reset_log()
+        t, out_df = timed(ds.extend_grant_data,grant_df,'bench',max_workers=w)
+        assert out_df.to_csv(index=False) == legacy_df[out_df.columns].to_csv(index=False)
+        print(fmt_row(f'session x{w}',f'{t:.2f}',f'{args.grants / t:.0f}',srv.connections))
+    srv.stop()
+
+if __name__ == '__main__':
+    main()
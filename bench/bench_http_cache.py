@@ -0,0 +1,38 @@
+import argparse
+import os
+import tempfile
+
+import pandas as pd
+
+from common import fmt_row, load_scraper, timed
+from mock_upstream import MockUpstream
+
+# repeat FPDS enrichment runs against a local stub server through the response cache:
+# cold, warm (inside the ttl), revalidating (ttl expired, server answers 304) and offline
+def main():
+    parser = argparse.ArgumentParser(description='HTTP response cache: network round trips and time per run')
+    parser.add_argument('--rows',type=int,default=200)
+    parser.add_argument('--latency',type=float,default=0.05)
+    args = parser.parse_args()
+    ds = load_scraper()
+    ds.tqdm = lambda x, **kw: x
+    os.chdir(tempfile.mkdtemp())
+    srv = MockUpstream(ds.data_key_dict,latency=args.latency).start()
+    ds.HOST_RATES[srv.netloc] = (1000.,1000)
+    contract_df = pd.DataFrame({'fpds_link': ['{}/fpds/PIID{}'.format(srv.root,i) for i in range(args.rows)]})
+    print(fmt_row('run','seconds','requests','rows ok'))
+    for label, ttl, offline in [('cold',3600,False),('warm',3600,False),('revalidate',0,False),('offline',0,True)]:
+        ds.http_cache = ds.HttpCache('./cache/http-cache.sqlite',ttl=ttl,offline=offline)
+        srv.reset_log()
+        t, out = timed(ds.extend_contract_data,contract_df,'bench',max_workers=8)
+        print(fmt_row(label,f'{t:.2f}',len(srv.request_log),out.award_procurement_id.notna().sum()))
+    # size-bounded eviction: a cache smaller than the corpus keeps only the most recently used pages
+    ds.http_cache = ds.HttpCache('./cache/small.sqlite',max_bytes=200_000)
+    ds.extend_contract_data(contract_df,'bench',max_workers=8)
+    n_kept = ds.http_cache.db.execute('SELECT COUNT(*) FROM responses').fetchone()[0]
+    print('200kB cache after {} pages: {} entries, {} bytes'.format(args.rows,n_kept,ds.http_cache.total_bytes))
+    assert ds.http_cache.total_bytes <= 200_000
+    srv.stop()
+
+if __name__ == '__main__':
+    main()
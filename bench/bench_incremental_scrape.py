@@ -0,0 +1,43 @@
+import argparse
+import os
+import tempfile
+
+from common import fmt_row, load_scraper, timed
+from mock_upstream import MockUpstream
+from synth import synth_savings_records
+
+# full vs incremental scrape of a local mock of the savings API. after a first full scrape, a day's
+# worth of new records is added at the top of each listing and the incremental run should fetch only
+# the first couple of pages and hand the diff a correspondingly small stub table
+def main():
+    parser = argparse.ArgumentParser(description='incremental DOGE scrape vs full')
+    parser.add_argument('--records',type=int,default=20_000,help='records per endpoint')
+    parser.add_argument('--new',type=int,default=300,help='records added before the second run')
+    parser.add_argument('--latency',type=float,default=0.02)
+    args = parser.parse_args()
+    ds = load_scraper()
+    os.chdir(tempfile.mkdtemp())
+    srv = MockUpstream(ds.data_key_dict,latency=args.latency).start()
+    ds.DOGE_API_ROOT = srv.savings_root
+    ds.HOST_RATES[srv.netloc] = (1000.,1000)
+    for i, ep in enumerate(['contracts','grants','leases']):
+        srv.savings[ep] = synth_savings_records(ep,args.records,seed=i)
+    _, state, _ = ds.scrape_doge()
+    for i, ep in enumerate(['contracts','grants','leases']):
+        new = synth_savings_records(ep,args.new,seed=100 + i)
+        for rec in new:
+            rec['value'] += 0.5     # make sure none collide with existing records
+        srv.savings[ep] = new + srv.savings[ep]
+    print(fmt_row('mode','seconds','requests','stub rows','new rows'))
+    for label, incremental in [('full',False),('incremental',True)]:
+        srv.reset_log()
+        t, (dfs, _, used) = timed(ds.scrape_doge,incremental,state)
+        assert all(used) == incremental
+        n_new = sum(1 for df, ep in zip(dfs,['contracts','grants','leases'])
+            for fp in (ds.record_fp(rec) for rec in srv.savings[ep][:len(df)]) if fp not in state[ep]['fingerprints'])
+        assert n_new == 3 * args.new, 'incremental scrape missed new records'
+        print(fmt_row(label,f'{t:.2f}',len(srv.request_log),sum(len(df) for df in dfs),n_new))
+    srv.stop()
+
+if __name__ == '__main__':
+    main()
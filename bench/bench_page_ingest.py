@@ -0,0 +1,91 @@
+import argparse
+import multiprocessing as mp
+import os
+import tempfile
+import time
+
+import pandas as pd
+import requests as req
+
+from common import fmt_row, load_scraper, rss_kb
+from mock_upstream import MockUpstream
+from synth import synth_savings_records
+
+# peak RSS while scraping a many-page endpoint from a local mock API: the original loop (every page's
+# dicts kept until one DataFrame is built), per-page column chunks, and chunks spilled to disk. the chunk
+# cases run one page at a time and through scrape_doge, whose concurrent page fetches a full scrape uses.
+# 'scraping' is the peak before the pages are put together, 'peak' includes the finished table
+def legacy_scrape_endpoint(api_root,endpoint_str,params):
+    endpoint_json_list = []
+    p_scrape = True
+    page = 1
+    while p_scrape:
+        r = req.get(os.path.join(api_root,endpoint_str),params={**params,"page":page})
+        _json_list = r.json()['result'][endpoint_str]
+        p_scrape = page < r.json()['meta']['pages']
+        endpoint_json_list.extend(_json_list)
+        page += 1
+    df = pd.DataFrame(endpoint_json_list)
+    df = df.rename(columns={'description': 'description_doge'})
+    return df
+
+def scrape_child(conn,ds,fn,args):
+    with open('/proc/self/clear_refs','w') as f:
+        f.write('5')    # reset the VmHWM high-water mark
+    base = rss_kb()
+    at_assembly = []
+    to_df = ds.ChunkSink.to_df
+    def timed_to_df(sink):
+        at_assembly.append(rss_kb('VmHWM'))
+        return to_df(sink)
+    ds.ChunkSink.to_df = timed_to_df
+    t0 = time.perf_counter()
+    fn(*args)
+    t = time.perf_counter() - t0
+    conn.send((t,(rss_kb('VmHWM') - base) / 1024,(max(at_assembly) - base) / 1024 if at_assembly else None))
+
+def measure_scrape(ds,fn,*args):
+    # like common.measure_in_subprocess, plus the peak reached before ChunkSink.to_df builds the table
+    ctx = mp.get_context('fork')
+    recv, send = ctx.Pipe(duplex=False)
+    p = ctx.Process(target=scrape_child,args=(send,ds,fn,args))
+    p.start()
+    out = recv.recv()
+    p.join()
+    return out
+
+def main():
+    parser = argparse.ArgumentParser(description='memory use of paginated ingestion')
+    parser.add_argument('--pages',type=int,default=200)
+    parser.add_argument('--per-page',type=int,default=500)
+    parser.add_argument('--latency',type=float,default=0.02,help='mock response latency, so pages finish out of order')
+    args = parser.parse_args()
+    ds = load_scraper()
+    os.chdir(tempfile.mkdtemp())
+    srv = MockUpstream(ds.data_key_dict,latency=args.latency).start()
+    ds.HOST_RATES[srv.netloc] = (1000.,1000)
+    ds.DOGE_API_ROOT, ds.DOGE_PER_PAGE = srv.savings_root, args.per_page
+    records = synth_savings_records('contracts',args.pages * args.per_page)
+    for rec in records:
+        rec['description'] = rec['description'] * 8   # closer to real description lengths
+    srv.savings['contracts'] = records
+    params = {'sort_by': 'date','sort_order': 'desc','per_page': args.per_page}
+    print('{} pages x {} records'.format(args.pages,args.per_page))
+    print(fmt_row('ingestion','seconds','peak MB','scraping MB'))
+    cases = [   # measured before anything is scraped in this process, so no child starts with a warm heap
+        ('dict list',legacy_scrape_endpoint,(srv.savings_root,'contracts',params)),
+        ('chunks',ds.scrape_doge_endpoint,(srv.savings_root,'contracts',params)),
+        ('spilled',ds.scrape_doge_endpoint,(srv.savings_root,'contracts',params,None,None,'./pages')),
+        ('concurrent',ds.scrape_doge,(False,{},ds.DOGE_WORKERS,None,('contracts',))),
+        ('conc. spilled',ds.scrape_doge,(False,{},ds.DOGE_WORKERS,'./pages',('contracts',))),
+    ]
+    for label, fn, fn_args in cases:
+        t, mb, scraping_mb = measure_scrape(ds,fn,*fn_args)
+        print(fmt_row(label,f'{t:.2f}',f'{mb:.0f}','-' if scraping_mb is None else f'{scraping_mb:.0f}'))
+    legacy_df = legacy_scrape_endpoint(srv.savings_root,'contracts',params)
+    pd.testing.assert_frame_equal(legacy_df,ds.scrape_doge_endpoint(srv.savings_root,'contracts',params)[0])
+    pd.testing.assert_frame_equal(legacy_df,ds.scrape_doge(spill_dir='./pages',endpoints=('contracts',))[0][0])
+    srv.stop()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,52 @@
+import argparse
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+from bench_fpds_parse import load_corpus
+from common import fmt_row, load_scraper, timed
+from mock_upstream import MockUpstream
+
+# FPDS parsing spread over worker processes. first the raw parse throughput of a page corpus vs process
+# count, then extend_contract_data against the mock upstream with parsing inline vs in the process pool,
+# which must give the same rows in the same order
+def parse_pool(ds,pages,workers):
+    batches = [pages[i:i + ds.PARSE_BATCH] for i in range(0,len(pages),ds.PARSE_BATCH)]
+    with ProcessPoolExecutor(max_workers=workers) as ex:
+        return [row for rows in ex.map(ds.parse_fpds_batch,batches) for row in rows]
+
+def main():
+    parser = argparse.ArgumentParser(description='FPDS parse throughput vs worker processes')
+    parser.add_argument('--corpus',default=None,help='directory of saved FPDS pages, e.g. fixtures/fpds')
+    parser.add_argument('--pages',type=int,default=400,help='synthetic pages when no corpus is given')
+    parser.add_argument('--workers',type=int,nargs='+',default=[1,2,4,8])
+    parser.add_argument('--rows',type=int,default=200,help='rows for the end-to-end enrichment run')
+    args = parser.parse_args()
+    ds = load_scraper()
+    ds.tqdm = lambda x, **kw: x
+    pages = load_corpus(ds,args.corpus,args.pages)
+    print('{} pages, {} cpus'.format(len(pages),os.cpu_count()))
+    t_inline, expected = timed(lambda: [ds.parse_fpds_content(p) for p in pages])
+    print(fmt_row('processes','pages/s','speedup'))
+    print(fmt_row('inline',f'{len(pages) / t_inline:.0f}','1.0x'))
+    for w in args.workers:
+        t, rows = timed(parse_pool,ds,pages,w)
+        assert rows == expected, 'pooled parse differs'
+        print(fmt_row(w,f'{len(pages) / t:.0f}',f'{t_inline / t:.1f}x'))
+    os.chdir(tempfile.mkdtemp())
+    srv = MockUpstream(ds.data_key_dict).start()
+    ds.HOST_RATES[srv.netloc] = (1000.,1000)
+    contract_df = pd.DataFrame({'fpds_link': ['{}/fpds/PIID{}'.format(srv.root,i) for i in range(args.rows)] + ['not a link']})
+    print(fmt_row('parse workers','rows/s'))
+    t_base, base_df = timed(ds.extend_contract_data,contract_df,'bench',max_workers=8)
+    print(fmt_row(0,f'{args.rows / t_base:.0f}'))
+    for w in args.workers:
+        t, out_df = timed(ds.extend_contract_data,contract_df,'bench',max_workers=8,parse_workers=w)
+        pd.testing.assert_frame_equal(base_df,out_df)
+        print(fmt_row(w,f'{args.rows / t:.0f}'))
+    srv.stop()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+import argparse
+import os
+import tempfile
+
+import pandas as pd
+
+from common import fmt_row, load_scraper, timed
+from mock_upstream import MockUpstream
+from synth import synth_fpds_html, synth_savings_records
+
+# a first run against the mock upstream with every raw body archived, then the contract and grant tables rebuilt
+# from the archive alone with the mock stopped: as they were, and after data_key_dict gains a field. checks the
+# rebuilt tables match the fetched ones and the new field is filled in, in the parquet backend too. then reparse
+# throughput vs worker processes on a larger archive of FPDS pages, and the minutes a full-history reparse would take
+def read_tables():
+    return {name: pd.read_csv(os.path.join('data',f'doge-{name}.csv')).drop(columns='dt_scrape') for name in ['contract','grant']}
+
+def main():
+    parser = argparse.ArgumentParser(description='raw-response archive: size, offline reparse, throughput vs workers')
+    parser.add_argument('--records',type=int,default=300)
+    parser.add_argument('--rate',type=float,default=20.,help='per-host requests per second against the mock')
+    parser.add_argument('--pages',type=int,default=5000,help='FPDS pages in the throughput archive')
+    parser.add_argument('--workers',type=int,nargs='+',default=sorted({1,os.cpu_count()}))
+    parser.add_argument('--history',type=int,default=100_000,help='archived pages a full-history reparse is projected for')
+    args = parser.parse_args()
+    ds = load_scraper()
+    ds.tqdm = lambda x, **kw: x
+    srv = MockUpstream(ds.data_key_dict,latency=0.01).start()
+    ds.HOST_RATES[srv.netloc] = (args.rate,4)
+    ds.DOGE_API_ROOT, ds.USAS_API_ROOT = srv.savings_root, srv.usas_root
+    srv.savings = {endpoint: synth_savings_records(endpoint,args.records,fpds_root=srv.root) for endpoint in ['contracts','grants','leases']}
+
+    os.chdir(tempfile.mkdtemp())
+    os.makedirs('data')
+    ds.raw_archive = ds.RawArchive('archive')
+    t_fetch, frames = timed(ds.update_doge_data,append=True)
+    ds.save_doge_data(*frames[:6],append=True)
+    fetched = read_tables()
+    print(ds.raw_archive.summary())
+    ds.raw_archive = None
+    srv.reset_log()
+    srv.stop()
+
+    print(fmt_row('run','seconds','rows'))
+    print(fmt_row('fetch',f'{t_fetch:.2f}',args.records * 2))
+    t_reparse, _ = timed(ds.reparse_tables,archive_dir='archive')
+    print(fmt_row('reparse',f'{t_reparse:.2f}',args.records * 2))
+    assert not srv.request_log, 'reparse made requests'
+    for name, df in read_tables().items():
+        pd.testing.assert_frame_equal(df,fetched[name],check_dtype=False,obj=f'reparsed {name} table')
+
+    ds.data_key_dict['filler_field'] = 'filler0'    # the mock pages carry unrelated inputs, pick one up
+    t_new, _ = timed(ds.reparse_tables,archive_dir='archive',tables=('contract',))
+    contract = read_tables()['contract']
+    print(fmt_row('new field',f'{t_new:.2f}',contract.filler_field.notna().sum()))
+    assert contract.filler_field.notna().all()
+    pd.testing.assert_frame_equal(contract.drop(columns='filler_field'),fetched['contract'],check_dtype=False)
+
+    # the same with the parquet backend: same row count, rewritten columns, so the parts have to be replaced
+    ds.save_table(ds.clean_pre_df(pd.read_csv(os.path.join('data','doge-contract.csv')).drop(columns='filler_field'),'contract'),
+        'contract','parquet',export_csv=False)
+    t_pq, _ = timed(ds.reparse_tables,backend='parquet',archive_dir='archive',tables=('contract',))
+    stored = ds.load_table('contract','parquet').drop(columns='dt_scrape')
+    print(fmt_row('parquet',f'{t_pq:.2f}',stored.filler_field.notna().sum()))
+    assert stored.filler_field.notna().all() and len(ds.parquet_parts('contract')) == 1
+    pd.testing.assert_frame_equal(stored.astype(str),read_tables()['contract'].astype(str),obj='parquet vs exported csv')
+    del ds.data_key_dict['filler_field']
+
+    # throughput on a bigger archive; storing the same bodies again adds nothing, and a torn tail is skipped
+    archive = ds.RawArchive('big-archive',segment_bytes=64 * 1024**2)
+    links = ['https://www.fpds.gov/ezsearch/jsp/viewLinkController.jsp?PIID=P{}'.format(i) for i in range(args.pages)]
+    bodies = [synth_fpds_html('P{}'.format(i),ds.data_key_dict) for i in range(args.pages)]
+    t_put, _ = timed(lambda: [archive.put('fpds',link,body) for link, body in zip(links,bodies)])
+    print(archive.summary() + ', {:.0f} pages/s'.format(args.pages / t_put))
+    assert not any(archive.put('fpds',link,body) for link, body in zip(links[:100],bodies[:100]))
+    with open(archive.segment_path(),'ab') as f:
+        f.write(b'\x28\xb5\x2f')
+    with open(os.path.join('big-archive','index.jsonl'),'a') as f:
+        f.write('{"key": "https://www.fpds.gov/torn')
+    expected = [ds.parse_fpds_content(body) for body in bodies[:200]]
+    print(fmt_row('workers','seconds','pages/s','full history'))
+    for workers in args.workers:
+        t, parsed = timed(ds.reparse_links,links,'fpds',lambda link: link,'big-archive',workers)
+        assert len(parsed) == args.pages and [parsed[link] for link in links[:200]] == expected
+        print(fmt_row(workers,f'{t:.2f}',f'{args.pages / t:.0f}','{:.1f} min'.format(args.history / (args.pages / t) / 60)))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,29 @@
+import argparse
+
+from common import fmt_row, load_scraper, timed
+from synth import perturb, synth_contract_stub
+
+# df_row_diff_2 is O(N*M), so it's timed on a sample of stub rows and extrapolated to the full table
+def main():
+    parser = argparse.ArgumentParser(description='compare df_row_diff_2 and df_row_diff_3 on synthetic contract tables')
+    parser.add_argument('--sizes',type=int,nargs='+',default=[10_000,100_000,1_000_000])
+    parser.add_argument('--sample',type=int,default=200,help='stub rows used to time df_row_diff_2')
+    args = parser.parse_args()
+    ds = load_scraper()
+    ds.tqdm = lambda x, **kw: x
+    print(fmt_row('rows','diff_2 (s)','diff_3 (s)','speedup','new'))
+    for n in args.sizes:
+        old_df = synth_contract_stub(n)
+        stub_df = perturb(old_df)
+        sample_df = stub_df.sample(min(args.sample,len(stub_df)),random_state=0)
+        t2, (sample_new_2, _) = timed(ds.df_row_diff_2,old_df,sample_df)
+        t2 = t2 * len(stub_df) / len(sample_df)
+        sample_new_3, _ = ds.df_row_diff_3(old_df,sample_df)
+        assert sample_new_2.index.equals(sample_new_3.index), 'df_row_diff_3 disagrees with df_row_diff_2'
+        t3, (new_df, drop_idx) = timed(ds.df_row_diff_3,old_df,stub_df)
+        assert len(new_df) + len(drop_idx) == len(stub_df)
+        print(fmt_row(n,f'{t2:.1f}*',f'{t3:.2f}',f'{t2 / t3:.0f}x',len(new_df)))
+    print('* extrapolated from a {}-row sample'.format(args.sample))
+
+if __name__ == '__main__':
+    main()
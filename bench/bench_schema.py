@@ -0,0 +1,35 @@
+import argparse
+import os
+import tempfile
+
+from common import fmt_row, load_scraper, timed
+from synth import perturb, synth_contract_history, synth_contract_stub
+
+# in-memory size and diff time of the contract history loaded the old way (clean_pre_df's fillna(''))
+# vs with the TABLE_TYPES schema. both must find the same new rows in a perturbed stub
+def main():
+    parser = argparse.ArgumentParser(description='untyped vs typed contract table: memory and diff time')
+    parser.add_argument('--sizes',type=int,nargs='+',default=[10_000,100_000,300_000])
+    args = parser.parse_args()
+    ds = load_scraper()
+    os.chdir(tempfile.mkdtemp())
+    print(fmt_row('rows','table','load (s)','MB','diff (s)','new rows'))
+    for n in args.sizes:
+        synth_contract_history(n,ds.data_key_dict).to_csv('contract.csv',index=False)
+        stub_df = perturb(synth_contract_stub(n)).drop(columns=['uploaded_dt'])
+        stub_df.to_csv('stub.csv',index=False)
+        for label, name in [('untyped',None),('typed','contract')]:
+            ds.date_format_cache.clear()
+            t_load, pre_df = timed(lambda: ds.clean_pre_df(ds.safe_load_csv('contract.csv'),name))
+            stub = ds.safe_load_csv('stub.csv')
+            stub = ds.clean_stub_df(stub,name) if name else ds.clean_stub_df(stub)
+            t_diff, (new_df, _) = timed(ds.df_row_diff_3,pre_df,stub)
+            mb = pre_df.memory_usage(deep=True).sum() / 1e6
+            print(fmt_row(n,label,f'{t_load:.2f}',f'{mb:.1f}',f'{t_diff:.2f}',len(new_df)))
+            if name is None:
+                expected = new_df.piid.tolist()
+            else:
+                assert new_df.piid.tolist() == expected, 'typed diff found different rows'
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+import argparse
+import os
+import tempfile
+
+import pandas as pd
+
+from common import fmt_row, load_scraper, timed
+from mock_upstream import MockUpstream
+from synth import synth_savings_records
+
+# a first run against the mock upstream under a tight per-host limit, in one go vs split over N --shard runs
+# (each with its own limiter, as on separate runners) and merged. checks the merged tables match the
+# single run, a second merge changes nothing, and rows of a missing shard are picked up by the next run
+def read_tables():
+    return {name: pd.read_csv(os.path.join('data',f'doge-{name}.csv')).drop(columns='dt_scrape') for name in ['contract','grant','property']}
+
+def run_shards(ds,n_shards,backend,skip=()):
+    times = []
+    for i in range(n_shards):
+        ds.host_limiters.clear()
+        t, _ = timed(ds.shard_doge_data,i,n_shards,backend=backend)
+        times.append(t)
+        if i in skip:
+            os.remove(os.path.join(ds.SHARD_DIR,f'shard-{i}of{n_shards}.json'))
+    return times
+
+def main():
+    parser = argparse.ArgumentParser(description='single run vs sharded enrichment and merge')
+    parser.add_argument('--records',type=int,default=150)
+    parser.add_argument('--shards',type=int,default=3)
+    parser.add_argument('--rate',type=float,default=40.,help='per-host requests per second each runner is allowed')
+    parser.add_argument('--storage',choices=['csv','parquet','cdc'],default='csv')
+    args = parser.parse_args()
+    ds = load_scraper()
+    ds.tqdm = lambda x, **kw: x
+    srv = MockUpstream(ds.data_key_dict,latency=0.01).start()
+    ds.HOST_RATES[srv.netloc] = (args.rate,2)
+    ds.DOGE_API_ROOT, ds.USAS_API_ROOT = srv.savings_root, srv.usas_root
+    srv.savings = {endpoint: synth_savings_records(endpoint,args.records,fpds_root=srv.root) for endpoint in ['contracts','grants','leases']}
+
+    os.chdir(tempfile.mkdtemp())
+    os.makedirs('data')
+    ds.host_limiters.clear()
+    t_single, frames = timed(ds.update_doge_data,backend=args.storage)
+    ds.save_doge_data(*frames[:6],backend=args.storage)
+    single = read_tables()
+
+    os.chdir(tempfile.mkdtemp())
+    os.makedirs('data')
+    times = run_shards(ds,args.shards,args.storage)
+    t_merge, _ = timed(ds.merge_shards,backend=args.storage)
+    print(fmt_row('mode','runners','wall (s)','rows'))
+    print(fmt_row('single',1,f'{t_single:.2f}',len(single['contract'])))
+    print(fmt_row('sharded',args.shards,f'{max(times) + t_merge:.2f}',len(read_tables()['contract'])))
+    print('slowest shard {:.2f}s, merge {:.2f}s'.format(max(times),t_merge))
+    for name, df in read_tables().items():    # cdc's export can write whole-number ids as floats, so values not dtypes
+        pd.testing.assert_frame_equal(df,single[name],check_dtype=False,obj=f'merged {name} table')
+    before = {name: open(os.path.join('data',f'doge-{name}.csv')).read() for name in single}
+    ds.merge_shards(backend=args.storage)
+    assert all(open(os.path.join('data',f'doge-{name}.csv')).read() == before[name] for name in single), 'second merge changed the tables'
+
+    # shard 1 dies before its manifest: the merge goes ahead without it and the next run enriches what it missed
+    os.chdir(tempfile.mkdtemp())
+    os.makedirs('data')
+    run_shards(ds,args.shards,args.storage,skip=(1,))
+    n_merged, missing = ds.merge_shards(backend=args.storage)
+    assert missing == [1]
+    srv.reset_log()
+    frames = ds.update_doge_data(backend=args.storage)
+    ds.save_doge_data(*frames[:6],backend=args.storage)
+    print('missing shard 1: merged {} contract rows, next run fetched {} FPDS pages'.format(n_merged['contract'],srv.count_requests('/fpds/')))
+    assert n_merged['contract'] + srv.count_requests('/fpds/') == len(single['contract'])
+    assert sorted(read_tables()['contract'].piid) == sorted(single['contract'].piid)
+    srv.stop()
+
+if __name__ == '__main__':
+    main()
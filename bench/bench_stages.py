@@ -0,0 +1,116 @@
+import argparse
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+
+import pandas as pd
+
+from common import ROOT, fmt_row, load_scraper, timed
+from mock_upstream import MockUpstream
+from synth import synth_savings_records
+
+# startup cost of the cli (--help with lazy imports vs importing every dependency up front), then a daily
+# run against the mock upstream: the whole pipeline vs a leases-only refresh through the stage commands.
+# checks the staged pipeline writes the same tables as the one-go run, and that saving twice is a no-op
+SCRIPT = os.path.join(ROOT,'doge-scrape.py')
+EAGER = 'import numpy, pandas, requests, validators, bs4, lxml.etree, tqdm; from selenium.webdriver import Firefox'
+
+def best_wall(cmd,repeat):
+    return min(timed(subprocess.run,cmd,capture_output=True,check=True)[0] for _ in range(repeat))
+
+def read_tables():
+    return {name: pd.read_csv(os.path.join('data',f'doge-{name}.csv')).drop(columns='dt_scrape') for name in ['contract','grant','property']}
+
+def read_tables_in(path):
+    cwd = os.getcwd()
+    os.chdir(path)
+    try:
+        return read_tables()
+    finally:
+        os.chdir(cwd)
+
+def next_day(listing,root):
+    out = {}
+    for endpoint, records in listing.items():
+        new = synth_savings_records(endpoint,max(len(records) // 20,1),seed=1,fpds_root=root)
+        key = {'contracts': 'piid','grants': 'link','leases': 'location'}[endpoint]
+        for i, record in enumerate(new):
+            record[key] = '{}-new{}'.format(record[key],i)
+            if endpoint == 'contracts':
+                record['fpds_link'] = '{}/fpds/{}'.format(root,record['piid'])
+        out[endpoint] = new + records
+    return out
+
+def run_stages(ds,stages,tables=('contract','grant','property')):
+    for stage in stages:
+        if stage == 'scrape':
+            ds.run_scrape_stage(tables)
+        elif stage == 'diff':
+            ds.run_diff_stage()
+        elif stage.startswith('enrich-'):
+            ds.run_enrich_stage(stage.removeprefix('enrich-')[:-1])
+        else:
+            ds.run_save_stage()
+
+def main():
+    parser = argparse.ArgumentParser(description='cli startup time, and the full pipeline vs single stages')
+    parser.add_argument('--records',type=int,default=1000)
+    parser.add_argument('--rate',type=float,default=20.,help='per-host requests per second against the mock')
+    parser.add_argument('--repeat',type=int,default=5)
+    args = parser.parse_args()
+    t_help = best_wall([sys.executable,SCRIPT,'--help'],args.repeat)
+    t_eager = best_wall([sys.executable,'-c',EAGER],args.repeat)
+    importtime = subprocess.run([sys.executable,'-X','importtime',SCRIPT,'--help'],capture_output=True,text=True).stderr
+    print(fmt_row('startup','seconds'))
+    print(fmt_row('--help',f'{t_help:.2f}'))
+    print(fmt_row('eager imports',f'{t_eager:.2f}'))
+    assert not any(f'| {m}' in importtime for m in ['pandas','numpy','requests','selenium']), '--help imported a heavy module'
+
+    ds = load_scraper()
+    ds.tqdm = lambda x, **kw: x
+    srv = MockUpstream(ds.data_key_dict,latency=0.01).start()
+    ds.HOST_RATES[srv.netloc] = (args.rate,4)
+    ds.DOGE_API_ROOT, ds.USAS_API_ROOT = srv.savings_root, srv.usas_root
+    day1 = {endpoint: synth_savings_records(endpoint,args.records,fpds_root=srv.root) for endpoint in ['contracts','grants','leases']}
+    day2 = next_day(day1,srv.root)
+    full_stages = ['scrape','diff','enrich-contracts','enrich-grants','save']
+
+    one_go, staged = tempfile.mkdtemp(), tempfile.mkdtemp()
+    for d in [one_go, staged]:
+        os.makedirs(os.path.join(d,'data'))
+    for day, listing in enumerate([day1,day2]):
+        srv.savings = listing
+        os.chdir(one_go)
+        ds.host_limiters.clear()
+        t_full, frames = timed(ds.update_doge_data,append=True)
+        ds.save_doge_data(*frames[:6],append=True)
+        ds.save_scrape_state(frames[6])
+        if day == 0:
+            shutil.copytree(one_go,one_go + '-day1')
+        os.chdir(staged)
+        ds.host_limiters.clear()
+        t_staged, _ = timed(run_stages,ds,full_stages)
+    for name, df in read_tables().items():
+        pd.testing.assert_frame_equal(df,read_tables_in(one_go)[name],check_dtype=False,obj=f'staged {name} table')
+    before = read_tables()
+    ds.run_save_stage()
+    assert all(df.equals(before[name]) for name, df in read_tables().items()), 'a second save changed the tables'
+
+    # the day-2 leases refresh, from the day-1 tables
+    os.chdir(one_go + '-day1')
+    ds.host_limiters.clear()
+    srv.reset_log()
+    t_leases, _ = timed(run_stages,ds,['scrape','diff','save'],tables=('property',))
+    n_props = len(read_tables()['property'])
+    print(fmt_row('day 2','seconds','requests'))
+    print(fmt_row('full',f'{t_full:.2f}',''))
+    print(fmt_row('staged, all',f'{t_staged:.2f}',''))
+    print(fmt_row('leases only',f'{t_leases:.2f}',len(srv.request_log)))
+    assert n_props == len(day2['leases']) and srv.count_requests('/fpds/') == 0
+    print('imports: ' + ', '.join('{} {:.2f}s'.format(k,v) for k, v in ds.import_times.items()))
+    srv.stop()
+
+if __name__ == '__main__':
+    main()
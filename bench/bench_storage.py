@@ -0,0 +1,34 @@
+import argparse
+import os
+import shutil
+import tempfile
+
+import pandas as pd
+
+from common import fmt_row, load_scraper, timed
+from synth import synth_contract_history
+
+# load/save cost of the contract history, csv vs parquet. "append" is a daily save that adds 1% new
+# rows: csv rewrites the whole file, parquet writes one new part
+def main():
+    parser = argparse.ArgumentParser(description='csv vs parquet storage for the contract table')
+    parser.add_argument('--sizes',type=int,nargs='+',default=[10_000,50_000,200_000])
+    args = parser.parse_args()
+    ds = load_scraper()
+    print(fmt_row('rows','backend','save (s)','load (s)','append (s)','MB on disk'))
+    for n in args.sizes:
+        df = ds.clean_pre_df(synth_contract_history(n,ds.data_key_dict),'contract')
+        new_df = ds.clean_pre_df(synth_contract_history(max(n // 100,1),ds.data_key_dict,seed=1),'contract')
+        grown_df = pd.concat([df,new_df],ignore_index=True)
+        for backend in ds.STORAGE_BACKENDS:
+            ds.DATA_DIR = tempfile.mkdtemp()
+            t_save, _ = timed(ds.save_table,df,'contract',backend,False,'a')
+            t_load, loaded_df = timed(lambda: ds.clean_pre_df(ds.load_table('contract',backend),'contract'))
+            assert len(ds.df_row_diff_3(loaded_df,df)[0]) == 0, 'round trip changed rows'
+            t_append, _ = timed(ds.save_table,grown_df,'contract',backend,False,'b')
+            size = sum(os.path.getsize(os.path.join(r,f)) for r, _, fs in os.walk(ds.DATA_DIR) for f in fs) / 1e6
+            print(fmt_row(n,backend,f'{t_save:.2f}',f'{t_load:.2f}',f'{t_append:.2f}',f'{size:.1f}'))
+            shutil.rmtree(ds.DATA_DIR)
+
+if __name__ == '__main__':
+    main()
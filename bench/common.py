@@ -0,0 +1,56 @@
+import importlib.util
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def load_scraper():
+    # doge-scrape.py isn't importable by name, load it from its path
+    spec = importlib.util.spec_from_file_location('doge_scrape',os.path.join(ROOT,'doge-scrape.py'))
+    mod = importlib.util.module_from_spec(spec)
+    sys.modules['doge_scrape'] = mod    # so functions sent to worker processes unpickle
+    spec.loader.exec_module(mod)
+    return mod
+
+def timed(fn,*args,repeat=1,**kwargs):
+    best = None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        out = fn(*args,**kwargs)
+        dt = time.perf_counter() - t0
+        best = dt if best is None else min(best,dt)
+    return best, out
+
+def fmt_row(*cols,width=14):
+    return ''.join(str(c).rjust(width) for c in cols)
+
+def rss_kb(field='VmRSS'):
+    with open('/proc/self/status') as f:
+        for line in f:
+            if line.startswith(field + ':'):
+                return int(line.split()[1])
+    return 0
+
+def _child(conn,fn,args):
+    try:
+        with open('/proc/self/clear_refs','w') as f:
+            f.write('5')    # reset the VmHWM high-water mark
+    except OSError:
+        pass
+    base = rss_kb()
+    t0 = time.perf_counter()
+    fn(*args)
+    conn.send((time.perf_counter() - t0,(rss_kb('VmHWM') - base) / 1024))
+    conn.close()
+
+def measure_in_subprocess(fn,*args):
+    # run fn in a forked child so peak RSS isn't polluted by earlier runs. returns (seconds, peak RSS growth in MB)
+    import multiprocessing as mp
+    ctx = mp.get_context('fork')
+    recv, send = ctx.Pipe(duplex=False)
+    p = ctx.Process(target=_child,args=(send,fn,args))
+    p.start()
+    out = recv.recv()
+    p.join()
+    return out
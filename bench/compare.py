@@ -0,0 +1,42 @@
+import argparse
+import json
+import sys
+
+from common import fmt_row
+
+# compare two suite.py results files. timings more than --threshold slower than the base are flagged
+# and make the exit status nonzero, so this can gate a change
+def fmt_value(v):
+    return '-' if v is None else f'{v:.4f}' if isinstance(v,float) else v
+
+def main():
+    parser = argparse.ArgumentParser(description='compare two benchmark suite results')
+    parser.add_argument('base',help='results/<commit>.json to compare against')
+    parser.add_argument('head')
+    parser.add_argument('--threshold',type=float,default=0.1,help='relative slowdown counted as a regression')
+    args = parser.parse_args()
+    with open(args.base) as f:
+        base = json.load(f)
+    with open(args.head) as f:
+        head = json.load(f)
+    if base.get('quick') != head.get('quick'):
+        print('warning: comparing a --quick run with a full one')
+    print(fmt_row('benchmark',base['commit'],head['commit'],'change','',width=24))
+    regressions = []
+    for name in list(base['results']) + [k for k in head['results'] if k not in base['results']]:
+        b, h = base['results'].get(name), head['results'].get(name)
+        if b is None or h is None:
+            print(fmt_row(name,fmt_value(b),fmt_value(h),'','',width=24))
+            continue
+        change = (h - b) / b if b else 0.
+        flag = ''
+        if isinstance(b,float) and change > args.threshold:
+            flag = 'REGRESSION'
+            regressions.append(name)
+        print(fmt_row(name,fmt_value(b),fmt_value(h),f'{change:+.1%}',flag,width=24))
+    if regressions:
+        print('{} regression(s) over {:.0%}: {}'.format(len(regressions),args.threshold,', '.join(sorted(regressions))))
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
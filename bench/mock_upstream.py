@@ -0,0 +1,231 @@
+import argparse
+import collections
+import glob
+import json
+import math
+import os
+import random
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from synth import synth_fpds_html, synth_usas_award
+
+# local stand-in for the upstream servers the scraper talks to. responses are replayed from a fixtures
+# directory (see record_fixtures.py) when one is given, otherwise synthesized. every request is logged
+# with its arrival time so benchmarks can check that client-side rate limits held
+class MockHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    wbufsize = -1   # headers and body go out in one write, keep-alive would otherwise stall on delayed ACKs
+    disable_nagle_algorithm = True
+
+    def log_message(self,*args):
+        pass
+
+    def setup(self):
+        super().setup()
+        with self.server.lock:
+            self.server.connections += 1
+
+    def finish_request(self):
+        # a request stops counting as in flight once its response starts going out
+        if self.in_flight:
+            self.in_flight = False
+            with self.server.lock:
+                self.server.inflight -= 1
+
+    def send_body(self,status,body,content_type='text/html',etag=None,headers={}):
+        self.finish_request()
+        self.send_response(status)
+        self.send_header('Content-Type',content_type)
+        if etag:
+            self.send_header('ETag',etag)
+        for k, v in headers.items():
+            self.send_header(k,v)
+        self.send_header('Content-Length',str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        srv = self.server
+        with srv.lock:
+            srv.request_log.append((time.monotonic(),self.path))
+            srv.inflight += 1
+            srv.max_inflight = max(srv.max_inflight,srv.inflight)
+        self.in_flight = True
+        try:
+            self.respond()
+        finally:
+            self.finish_request()
+
+    def throttled(self):
+        # a sliding one-second window of accepted requests; past throttle_rate the server answers 429
+        srv = self.server
+        with srv.lock:
+            now = time.monotonic()
+            while srv.accepted and now - srv.accepted[0] > 1.:
+                srv.accepted.popleft()
+            if len(srv.accepted) >= srv.throttle_rate:
+                srv.throttle_log.append(now)
+                return True
+            srv.accepted.append(now)
+            return False
+
+    def respond(self):
+        srv = self.server
+        with srv.lock:
+            scripted = srv.scripted.popleft() if srv.scripted else None
+        if scripted == 'bad_json':
+            return self.send_body(200,b'{"success": true, "result": {',content_type='application/json')
+        if scripted is not None:
+            return self.send_body(scripted,b'scripted error',headers={'Retry-After': str(srv.retry_after)} if srv.retry_after is not None else {})
+        if srv.throttle_rate and self.throttled():
+            return self.send_body(429,b'slow down',headers={'Retry-After': str(srv.retry_after)} if srv.retry_after is not None else {})
+        if srv.latency:
+            # with slow_per_inflight, responses slow down as concurrent load on the server grows
+            time.sleep(srv.latency + srv.slow_per_inflight * max(srv.inflight - 1,0))
+        if srv.error_rate and random.random() < srv.error_rate:
+            return self.send_body(500,b'upstream error')
+        path = self.path.split('?')[0]
+        if path.startswith('/api/v2/awards/'):
+            award_id = path[len('/api/v2/awards/'):].strip('/')
+            body = srv.awards.get(award_id) or json.dumps(synth_usas_award(award_id)).encode()
+            return self.send_body(200,body,content_type='application/json')
+        if path.startswith('/savings/'):
+            return self.send_savings_page(path[len('/savings/'):].strip('/'))
+        if path.startswith('/fpds/'):
+            etag = '"{:08x}"'.format(zlib.crc32(path.encode()))
+            if srv.etags and self.headers.get('If-None-Match') == etag:
+                return self.send_body(304,b'',etag=etag)
+            piid = path[len('/fpds/'):]
+            body = srv.fpds_pages.get(piid) or synth_fpds_html(piid,srv.data_key_dict)
+            return self.send_body(200,body,etag=etag if srv.etags else None)
+        self.send_body(404,b'not found')
+
+    def send_savings_page(self,endpoint):
+        if endpoint not in self.server.savings:
+            return self.send_body(404,b'not found')
+        query = parse_qs(urlparse(self.path).query)
+        page = int(query.get('page',['1'])[0])
+        per_page = int(query.get('per_page',['100'])[0])
+        records = self.server.savings[endpoint]
+        if self.server.bad_json_rate and random.random() < self.server.bad_json_rate:
+            return self.send_body(200,b'{"success": true, "result": {',content_type='application/json')
+        body = {
+            'success': True,
+            'result': {endpoint: records[(page - 1) * per_page:page * per_page]},
+            'meta': {'total_results': len(records),'pages': max(1,math.ceil(len(records) / per_page))},
+        }
+        self.send_body(200,json.dumps(body).encode(),content_type='application/json')
+
+class MockUpstream(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self,data_key_dict,latency=0.,error_rate=0.,bad_json_rate=0.,etags=True,port=0,fixtures=None,
+        throttle_rate=None,retry_after=None,slow_per_inflight=0.):
+        super().__init__(('127.0.0.1',port),MockHandler)
+        self.data_key_dict = data_key_dict
+        self.etags = etags
+        self.savings = {}   # endpoint: records served by /savings/<endpoint>, newest first
+        self.fpds_pages = {}    # piid: recorded FPDS page body
+        self.awards = {}    # award id: recorded USASpending award body
+        if fixtures:
+            self.load_fixtures(fixtures)
+        self.latency = latency
+        self.error_rate = error_rate
+        self.bad_json_rate = bad_json_rate
+        self.throttle_rate = throttle_rate  # requests per second before answering 429
+        self.retry_after = retry_after  # seconds sent with each 429
+        self.slow_per_inflight = slow_per_inflight
+        self.scripted = collections.deque()    # statuses (or 'bad_json') to answer the next requests with, in order
+        self.lock = threading.Lock()
+        self.request_log = []
+        self.connections = 0
+        self.accepted = collections.deque()
+        self.throttle_log = []    # arrival times of requests answered 429
+        self.inflight = 0
+        self.max_inflight = 0
+        self.thread = None
+
+    def load_fixtures(self,fixtures_dir):
+        # savings/<endpoint>.json holds a record list, fpds/<piid>.html and awards/<id>.json raw bodies
+        for fp in glob.glob(os.path.join(fixtures_dir,'savings','*.json')):
+            with open(fp) as f:
+                self.savings[os.path.basename(fp)[:-5]] = json.load(f)
+        for record in self.savings.get('contracts',[]):
+            if record.get('piid'):
+                record['fpds_link'] = '{}/fpds/{}'.format(self.root,record['piid'])   # replay fpds pages from here
+        for sub, store in [('fpds',self.fpds_pages),('awards',self.awards)]:
+            for fp in glob.glob(os.path.join(fixtures_dir,sub,'*')):
+                with open(fp,'rb') as f:
+                    store[os.path.splitext(os.path.basename(fp))[0]] = f.read()
+        return self
+
+    @property
+    def root(self):
+        return 'http://127.0.0.1:{}'.format(self.server_address[1])
+
+    @property
+    def savings_root(self):
+        return self.root + '/savings/'
+
+    @property
+    def usas_root(self):
+        return self.root + '/api/v2/awards/'
+
+    @property
+    def netloc(self):
+        return '127.0.0.1:{}'.format(self.server_address[1])
+
+    def start(self):
+        self.thread = threading.Thread(target=self.serve_forever,daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+    def reset_log(self):
+        with self.lock:
+            self.request_log = []
+            self.connections = 0
+            self.accepted.clear()
+            self.throttle_log = []
+            self.max_inflight = 0
+
+    def count_requests(self,prefix):
+        return sum(1 for _, path in self.request_log if path.startswith(prefix))
+
+    def max_window_count(self,window=1.):
+        # most requests that arrived inside any `window`-second span
+        ts = sorted(t for t, _ in self.request_log)
+        best, lo = 0, 0
+        for hi, t in enumerate(ts):
+            while t - ts[lo] > window:
+                lo += 1
+            best = max(best,hi - lo + 1)
+        return best
+
+def main():
+    # serve on a fixed port for manual runs, e.g. pointing DOGE_API_ROOT at http://127.0.0.1:8000/savings/
+    parser = argparse.ArgumentParser(description='local stand-in for api.doge.gov, FPDS and USASpending')
+    parser.add_argument('--port',type=int,default=8000)
+    parser.add_argument('--fixtures',default=None,help='directory written by record_fixtures.py')
+    parser.add_argument('--records',type=int,default=1000,help='synthetic records per savings endpoint without fixtures')
+    parser.add_argument('--latency',type=float,default=0.)
+    parser.add_argument('--error-rate',type=float,default=0.)
+    args = parser.parse_args()
+    from common import load_scraper
+    from synth import synth_savings_records
+    srv = MockUpstream(load_scraper().data_key_dict,latency=args.latency,error_rate=args.error_rate,port=args.port,fixtures=args.fixtures)
+    for endpoint in ['contracts','grants','leases']:
+        if endpoint not in srv.savings:
+            srv.savings[endpoint] = synth_savings_records(endpoint,args.records,fpds_root=srv.root)
+    print('serving on ' + srv.root)
+    srv.serve_forever()
+
+if __name__ == '__main__':
+    main()
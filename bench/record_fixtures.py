@@ -0,0 +1,38 @@
+import argparse
+import os
+
+from common import load_scraper
+
+# record a small slice of the live savings API plus the FPDS pages and USASpending awards it links to,
+# as fixtures for mock_upstream.py. this is the only bench script that talks to the real servers
+def save(path,body):
+    os.makedirs(os.path.dirname(path),exist_ok=True)
+    with open(path,'wb') as f:
+        f.write(body)
+
+def main():
+    parser = argparse.ArgumentParser(description='record live responses as mock upstream fixtures')
+    parser.add_argument('--out',default='fixtures')
+    parser.add_argument('--records',type=int,default=500,help='newest records per savings endpoint')
+    parser.add_argument('--details',type=int,default=50,help='FPDS pages and USASpending awards to record')
+    args = parser.parse_args()
+    ds = load_scraper()
+    rh = ds.req.utils.default_headers()
+    params = {'sort_by': 'date','sort_order': 'desc','per_page': args.records,'page': 1}
+    records = {}
+    for endpoint in ['contracts','grants','leases']:
+        records[endpoint] = ds.fetch_doge_page(os.path.join(ds.DOGE_API_ROOT,endpoint),params)['result'][endpoint]
+        save(os.path.join(args.out,'savings',endpoint + '.json'),ds.json.dumps(records[endpoint]).encode())
+    for record in [r for r in records['contracts'] if r.get('piid') and r.get('fpds_link')][:args.details]:
+        r = ds.polite_get(record['fpds_link'],headers=rh)
+        if r.status_code == 200:
+            save(os.path.join(args.out,'fpds',record['piid'] + '.html'),r.content)
+    for record in [r for r in records['grants'] if ds.validators.url(r.get('link') or '')][:args.details]:
+        award_id = os.path.basename(record['link'])
+        r = ds.polite_get(os.path.join(ds.USAS_API_ROOT,award_id),headers=rh)
+        if r.status_code == 200:
+            save(os.path.join(args.out,'awards',award_id + '.json'),r.content)
+    print('fixtures written to ' + args.out)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,140 @@
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+from bs4 import BeautifulSoup
+
+from bench_clean_stub import lease_stub
+from common import ROOT, fmt_row, load_scraper, timed
+from mock_upstream import MockUpstream
+from synth import perturb, synth_contract_history, synth_contract_stub, synth_fpds_html, synth_grant_stub, synth_property_stub, synth_savings_records
+
+# regression suite: microbenchmarks of the pipeline's hot functions plus the real update_doge_data/save_doge_data
+# run end to end against the mock upstream. results go to results/<commit>.json, compare two with compare.py
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)),'results')
+SIZES = { # full, --quick
+    'diff_rows': (100_000,10_000),
+    'diff_2_rows': (5_000,1_000),
+    'fpds_pages': (200,50),
+    'stub_rows': (100_000,10_000),
+    'table_rows': (100_000,10_000),
+    'e2e_records': (400,100),
+}
+
+def git_commit():
+    def git(*args):
+        return subprocess.run(['git',*args],cwd=ROOT,capture_output=True,text=True).stdout.strip()
+    commit = git('rev-parse','--short','HEAD') or 'unknown'
+    return commit + '-dirty' if git('status','--porcelain','--untracked-files=no') else commit
+
+def bench_row_diff(ds,size,repeat):
+    old_df = synth_contract_stub(size('diff_rows'))
+    stub_df = perturb(old_df)
+    small_df = synth_contract_stub(size('diff_2_rows'))
+    sample_df = perturb(small_df).iloc[:200]
+    return {
+        'row_diff_2': timed(ds.df_row_diff_2,small_df,sample_df,repeat=repeat)[0],
+        'row_diff_3': timed(ds.df_row_diff_3,old_df,stub_df,repeat=repeat)[0],
+    }
+
+def bench_fpds_parse(ds,size,repeat):
+    pages = [synth_fpds_html('PIID{}'.format(i),ds.data_key_dict) for i in range(size('fpds_pages'))]
+    return {
+        'parse_fpds_html': timed(lambda: [ds.parse_fpds_html(BeautifulSoup(p,features='lxml')) for p in pages],repeat=repeat)[0],
+        'parse_fpds_content': timed(lambda: [ds.parse_fpds_content(p) for p in pages],repeat=repeat)[0],
+    }
+
+def bench_clean_stub(ds,size,repeat):
+    n = size('stub_rows')
+    def run(make):
+        ds.date_format_cache.clear()
+        return ds.clean_stub_df(make(n))
+    return {
+        'clean_stub_leases': timed(run,lease_stub,repeat=repeat)[0],
+        'clean_stub_grants': timed(run,lambda n: synth_grant_stub(n).rename(columns={'date': 'uploaded_on'}),repeat=repeat)[0],
+    }
+
+def bench_storage(ds,size,repeat):
+    n = size('table_rows')
+    tables = [ds.clean_pre_df(synth_contract_history(n,ds.data_key_dict)),synth_grant_stub(n // 10),synth_property_stub(n // 10)]
+    os.makedirs('data',exist_ok=True)
+    t_save, _ = timed(ds.save_doge_data,*tables,None,None,None,repeat=repeat)
+    t_load, loaded = timed(ds.load_pre_data,repeat=repeat)
+    assert [len(df) for df in loaded] == [len(df) for df in tables]
+    return {'save_doge_data': t_save,'load_pre_data': t_load}
+
+def bench_end_to_end(ds,size,latency,error_rate):
+    # a first run against an empty data/ directory, then a daily run where 5% of the listing is new
+    os.chdir(tempfile.mkdtemp())
+    os.makedirs('data')
+    srv = MockUpstream(ds.data_key_dict,latency=latency,error_rate=error_rate).start()
+    ds.HOST_RATES[srv.netloc] = (1000.,1000)
+    ds.DOGE_API_ROOT, ds.USAS_API_ROOT, ds.BACKOFF_S = srv.savings_root, srv.usas_root, 0.01
+    n = size('e2e_records')
+    listing = {endpoint: synth_savings_records(endpoint,n,fpds_root=srv.root) for endpoint in ['contracts','grants','leases']}
+    new = {endpoint: synth_savings_records(endpoint,max(len(records) // 20,1),seed=1,fpds_root=srv.root)
+        for endpoint, records in listing.items()}
+    for record in new['contracts']:
+        record['piid'] += '-new'
+        record['fpds_link'] = '{}/fpds/{}'.format(srv.root,record['piid'])
+    for record in new['grants']:
+        record['link'] += '-new'
+    out = {}
+    for label, savings in [('e2e_first_run',listing),('e2e_daily_run',{k: new[k] + listing[k] for k in listing})]:
+        srv.savings = savings
+        srv.reset_log()
+        t, frames = timed(ds.update_doge_data,append=True)   # as main runs it
+        ds.save_doge_data(*frames[:6],append=True)
+        out[label] = t
+        out[label + '_requests'] = len(srv.request_log)
+    assert len(ds.load_table('contract')) == len(listing['contracts']) + len(new['contracts'])
+    srv.stop()
+    return out
+
+def main():
+    parser = argparse.ArgumentParser(description='benchmark suite, results stored per commit')
+    parser.add_argument('--quick',action='store_true',help='smaller inputs, for a fast sanity run')
+    parser.add_argument('--repeat',type=int,default=3,help='best of this many runs for the microbenchmarks')
+    parser.add_argument('--latency',type=float,default=0.02,help='mock upstream seconds per response')
+    parser.add_argument('--error-rate',type=float,default=0.02,help='share of mock upstream responses that are 500s')
+    parser.add_argument('--skip-e2e',action='store_true')
+    parser.add_argument('--out',default=None,help='results file (default results/<commit>.json)')
+    args = parser.parse_args()
+    ds = load_scraper()
+    ds.tqdm = lambda x, **kw: x
+    size = lambda k: SIZES[k][args.quick]
+    commit = git_commit()
+    os.chdir(tempfile.mkdtemp())    # data/ and runlog/ for the runs go here
+    results = {}
+    for bench in [bench_row_diff,bench_fpds_parse,bench_clean_stub,bench_storage]:
+        results.update(bench(ds,size,args.repeat))
+    if not args.skip_e2e:
+        results.update(bench_end_to_end(ds,size,args.latency,args.error_rate))
+    print(fmt_row('benchmark','value',width=24))
+    for name, value in results.items():
+        print(fmt_row(name,f'{value:.4f}' if isinstance(value,float) else value,width=24))
+    out_path = args.out or os.path.join(RESULTS_DIR,commit + ('-quick' if args.quick else '') + '.json')
+    os.makedirs(os.path.dirname(out_path),exist_ok=True)
+    with open(out_path,'w') as f:
+        json.dump({
+            'commit': commit,
+            'date': datetime.now().isoformat(timespec='seconds'),
+            'quick': args.quick,
+            'python': sys.version.split()[0],
+            'pandas': pd.__version__,
+            'numpy': np.__version__,
+            'machine': platform.machine(),
+            'cpus': os.cpu_count(),
+            'results': results,
+        },f,indent=1)
+    print('results written to ' + out_path)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,132 @@
+import zlib
+
+import numpy as np
+import pandas as pd
+
+AGENCIES = ['Department of Education','Department of State','General Services Administration',
+    'Department of Agriculture','Department of Health and Human Services','Small Business Administration',
+    'Department of Labor','Environmental Protection Agency','Department of Energy','USAID']
+STATES = ['ID','CO','ND','FL','TX','CA','NY','VA','MD','WA']
+CITIES = ['IDAHO FALLS','LITTLETON','MINOT','MIAMI','AUSTIN','FRESNO','ALBANY','RESTON','BALTIMORE','SPOKANE']
+
+def synth_contract_stub(n,seed=0):
+    rng = np.random.default_rng(seed)
+    piid = np.char.add('PIID',np.arange(n).astype(str))
+    return pd.DataFrame({
+        'piid': piid,
+        'agency': np.array(AGENCIES)[rng.integers(0,len(AGENCIES),n)],
+        'vendor': np.char.add('VENDOR ',rng.integers(0,n // 10 + 1,n).astype(str)),
+        'value': np.round(rng.uniform(0,5e6,n),2),
+        'description_doge': np.char.add('CONTRACT FOR SERVICES ',rng.integers(0,1000,n).astype(str)),
+        'fpds_status': np.array(['CLOSE OUT','TERMINATED',''])[rng.integers(0,3,n)],
+        'fpds_link': np.char.add('https://www.fpds.gov/ezsearch/jsp/viewLinkController.jsp?PIID=',piid),
+        'savings': np.round(rng.uniform(0,1e6,n),2),
+        'uploaded_dt': pd.Timestamp('2025-02-01') + pd.to_timedelta(rng.integers(0,90,n),unit='D'),
+    })
+
+def synth_grant_stub(n,seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        'date': pd.Timestamp('2025-02-01').strftime('%-m/%-d/%Y'),
+        'agency': np.array(AGENCIES)[rng.integers(0,len(AGENCIES),n)],
+        'recipient': np.char.add('RECIPIENT ',rng.integers(0,n // 5 + 1,n).astype(str)),
+        'value': np.round(rng.uniform(0,5e6,n),2),
+        'savings': np.round(rng.uniform(0,1e6,n),2),
+        'link': np.char.add('https://www.usaspending.gov/award/ASST_NON_',np.arange(n).astype(str)),
+        'description_doge': np.char.add('GRANT PROGRAM ',rng.integers(0,1000,n).astype(str)),
+    })
+
+def synth_property_stub(n,seed=0):
+    rng = np.random.default_rng(seed)
+    ci = rng.integers(0,len(CITIES),n)
+    return pd.DataFrame({
+        'date': (pd.Timestamp('2025-02-01') + pd.to_timedelta(rng.integers(0,90,n),unit='D')).strftime('%-m/%-d/%Y'),
+        'location': np.char.add(np.char.add(np.array(CITIES)[ci],', '),np.array(STATES)[ci]),
+        'sq_ft': rng.integers(500,50000,n),
+        'description_doge': 'Soft Term Terminations via PBS Commissioner Letter 2.25.25',
+        'value': rng.integers(1000,500000,n),
+        'savings': rng.integers(1000,500000,n),
+        'agency': np.array(AGENCIES)[rng.integers(0,len(AGENCIES),n)],
+    })
+
+def perturb(old_df,frac_changed=0.05,frac_new=0.05,seed=1,synth=synth_contract_stub):
+    # stub table built from old_df: most rows unchanged, some edited upstream, some brand new
+    rng = np.random.default_rng(seed)
+    stub_df = old_df.copy()
+    n = len(stub_df)
+    changed = rng.random(n) < frac_changed
+    stub_df.loc[changed,'savings'] = stub_df.loc[changed,'savings'] + 1
+    new_df = synth(max(int(n * frac_new),1),seed=seed + 1000)
+    first_col = new_df.columns[0]
+    new_df[first_col] = new_df[first_col].astype(str) + '-new'
+    stub_df = pd.concat([new_df,stub_df],ignore_index=True)
+    return stub_df
+
+def synth_fpds_html(piid,data_key_dict,n_filler=400):
+    # stand-in for an FPDS ezsearch award page: the wanted inputs buried among a lot of unrelated form markup
+    rng = np.random.default_rng(zlib.crc32(piid.encode()))
+    rows = []
+    for i in range(n_filler):
+        rows.append('<tr><td class="lbl">Field {0}</td><td><input type="text" id="filler{0}" name="filler{0}" value="{1}" readonly></td></tr>'.format(i,rng.integers(0,1e6)))
+    for k, qk in data_key_dict.items():
+        if 'amount' in k:
+            v = '${:,.2f}'.format(rng.uniform(0,5e6))
+        elif k.startswith('date'):
+            v = '{:02d}/{:02d}/20{:02d}'.format(rng.integers(1,13),rng.integers(1,29),rng.integers(15,26))
+        elif k == 'award_procurement_id':
+            v = piid
+        else:
+            v = 'VAL {} &amp; CO'.format(rng.integers(0,1e4))
+        rows.insert(int(rng.integers(0,len(rows))),'<tr><td class="lbl">{0}</td><td><input type="text" id="{0}" name="{0}" value="{1}" readonly></td></tr>'.format(qk,v))
+    return ('<!DOCTYPE html><html><head><meta charset="utf-8"><title>FPDS-NG: Award</title>'
+        '<script>function noop(){return 0;}</script></head><body><form name="awardForm" method="post"><table>'
+        + ''.join(rows)
+        + '</table><textarea id="descriptionOfContractRequirement" name="descriptionOfContractRequirement" rows="4">'
+        + 'SERVICES FOR {}</textarea></form></body></html>'.format(piid)).encode()
+
+def synth_contract_history(n,data_key_dict,seed=0):
+    # stub columns plus the FPDS fields extend_contract_data adds, like data/doge-contract.csv
+    rng = np.random.default_rng(seed)
+    df = synth_contract_stub(n,seed=seed)
+    for k in data_key_dict:
+        if 'amount' in k:
+            df[k] = np.round(rng.uniform(0,5e6,n),2)
+        elif k.startswith('date'):
+            df[k] = (pd.Timestamp('2019-01-01') + pd.to_timedelta(rng.integers(0,2000,n),unit='D')).strftime('%Y-%m-%d')
+        else:
+            df[k] = np.char.add('VAL ',rng.integers(0,5000,n).astype(str))
+    df['requirement_desc'] = None
+    df['dt_scrape'] = '2025-04-04-0017'
+    return df
+
+def synth_savings_records(endpoint,n,seed=0,fpds_root=None):
+    # raw api.doge.gov/savings records, newest first
+    synth = {'contracts': synth_contract_stub,'grants': synth_grant_stub,'leases': synth_property_stub}[endpoint]
+    df = synth(n,seed=seed).rename(columns={'description_doge': 'description'})
+    if endpoint == 'contracts':
+        df = df.drop(columns=['uploaded_dt'])
+        df['deleted_date'] = None
+        if fpds_root:
+            df['fpds_link'] = fpds_root + '/fpds/' + df['piid']
+    return df.to_dict('records')
+
+def synth_usas_award(award_id):
+    # trimmed-down shape of an api.usaspending.gov/api/v2/awards/<id> response
+    rng = np.random.default_rng(zlib.crc32(award_id.encode()))
+    return {
+        'id': int(rng.integers(1,1e8)),
+        'generated_unique_award_id': award_id,
+        'category': 'grant',
+        'type': '04',
+        'type_description': 'PROJECT GRANT (B)',
+        'description': 'GRANT PROGRAM {}'.format(rng.integers(0,1000)),
+        'total_obligation': float(np.round(rng.uniform(0,5e6),2)),
+        'base_and_all_options': None,
+        'date_signed': '2023-0{}-1{}'.format(rng.integers(1,10),rng.integers(0,10)),
+        'awarding_agency': {'id': int(rng.integers(1,1000)),'toptier_agency': {'name': AGENCIES[rng.integers(0,len(AGENCIES))],'code': '091'},
+            'subtier_agency': {'name': 'OFFICE OF ELEMENTARY AND SECONDARY EDUCATION','code': '9131'}},
+        'recipient': {'recipient_name': 'RECIPIENT {}'.format(rng.integers(0,1e4)),'recipient_uei': 'UEI{:09d}'.format(rng.integers(0,1e9)),
+            'location': {'city_name': CITIES[rng.integers(0,len(CITIES))],'state_code': STATES[rng.integers(0,len(STATES))],'zip5': '12345'}},
+        'period_of_performance': {'start_date': '2023-07-01','end_date': '2026-06-30','last_modified_date': '2025-02-14'},
+        'cfda_info': [{'cfda_number': '84.116','cfda_title': 'Fund for the Improvement of Postsecondary Education'}],
+    }
@@ -1,20 +1,104 @@
+import argparse
+import cProfile
+import hashlib
+import importlib
+import json
 import os
-from datetime import datetime
-from time import sleep
-
-import numpy as np
-import pandas as pd
-import requests as req
-import validators
-from bs4 import BeautifulSoup
-from ratelimit import limits, sleep_and_retry
-from selenium.webdriver import Firefox
-from selenium.webdriver.common.by import By
-from selenium.webdriver.firefox.options import Options
-from tqdm import tqdm
+import queue
+import random
+import sqlite3
+import threading
+import zlib
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from email.utils import parsedate_to_datetime
+from time import monotonic, perf_counter, process_time, sleep, time
+from urllib.parse import parse_qsl, urlencode, urlparse, urlunparse
+
+T_START = perf_counter()
+import_times = {}   # module: seconds its import took, once something first used it
+
+class LazyModule:
+    # stands in for a heavy module until its first use, then imports it and puts the real module in its
+    # place in this script's globals, so --help and stages that never touch it don't pay for the import.
+    # the lock keeps threads racing to first use from seeing a half-imported module
+    def __init__(self,name,alias):
+        self._name = name
+        self._alias = alias
+        self._lock = threading.Lock()
+        self._module = None
+
+    def __getattr__(self,attr):
+        if self._module is None:
+            with self._lock:
+                if self._module is None:
+                    t0 = perf_counter()
+                    module = importlib.import_module(self._name)
+                    import_times[self._name] = perf_counter() - t0
+                    globals()[self._alias] = module
+                    self._module = module
+        return getattr(self._module,attr)
+
+np = LazyModule('numpy','np')
+pd = LazyModule('pandas','pd')
+req = LazyModule('requests','req')
+validators = LazyModule('validators','validators')
+dammit = LazyModule('bs4.dammit','dammit')
+etree = LazyModule('lxml.etree','etree')
+tqdm_lib = LazyModule('tqdm','tqdm_lib')
+
+def tqdm(iterable,**kwargs):
+    return tqdm_lib.tqdm(iterable,**kwargs)
 
 N_REQ = 10
 LIMIT_S = 3    # 1000 reqs per 300s, or 10 reqs per 3s. Pretty lenient!
+FPDS_WORKERS = 4
+FPDS_PARSE_WORKERS = 0    # 0 parses in the fetch threads
+PARSE_BATCH = 16
+USAS_WORKERS = 4
+DOGE_WORKERS = 4
+DOGE_PAGE_WINDOW = 2 * DOGE_WORKERS    # pages of one endpoint submitted but not yet handed to its sink
+DOGE_PER_PAGE = 500
+DOGE_RETRIES = 5
+BACKOFF_S = 1.   # first retry delay, doubled on each later attempt
+REQ_TIMEOUT = 60
+HOST_RATES = { # host: (requests per second, burst). FPDS publishes no limit, keep it gentle
+    'www.fpds.gov': (2, 4),
+    'api.usaspending.gov': (N_REQ / LIMIT_S, N_REQ),
+    'api.doge.gov': (4, 8),
+}
+DEFAULT_HOST_RATE = (N_REQ / LIMIT_S, N_REQ)
+HOST_LIMITS = { # host: adaptive limiter bounds. the rate starts at HOST_RATES and moves within [min_rate, max_rate]
+    'www.fpds.gov': {'max_rate': 4, 'max_inflight': 8, 'latency_target': 5.},
+    'api.doge.gov': {'max_rate': 8},
+}
+DEFAULT_MAX_INFLIGHT = 16
+HTTP_RETRIES = 4    # retries of a 429, a 5xx or a dropped connection
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+MAX_RETRY_AFTER_S = 300
+DOGE_API_ROOT = 'https://api.doge.gov/savings/'
+USAS_API_ROOT = 'https://api.usaspending.gov/api/v2/awards/'
+SCRAPE_STATE_PATH = './data/doge-scrape-state.json'
+FULL_RESYNC_DAYS = 7    # incremental scrapes miss edits to older records, so walk everything this often
+DATE_FORMATS = ['%m/%d/%Y','%Y-%m-%d','%m/%d/%y','%Y-%m-%dT%H:%M:%S','%Y-%m-%dT%H:%M:%S.%fZ','%Y-%m-%d %H:%M:%S']
+CHECKPOINT_DIR = './runlog'
+STAGE_DIR = './cache/stages'
+CLI_STAGES = ['scrape','diff','enrich-contracts','enrich-grants','save']
+TABLE_ENDPOINTS = {'contract': 'contracts','grant': 'grants','property': 'leases'}
+SHARD_DIR = './shards'
+RUNLOG_DIR = './runlog'
+PIPELINE_STAGES = ['load','scrape','clean','diff','contracts','grants','save']
+LATENCY_BUCKETS_S = [0.05,0.1,0.25,0.5,1,2,5,10,30,60]
+CACHE_PATH = './cache/http-cache.sqlite'
+PAGE_SPILL_DIR = './cache/pages'
+CACHE_TTL_S = 7 * 24 * 3600
+CACHE_MAX_BYTES = 2 * 1024**3
+ARCHIVE_DIR = './archive'
+ARCHIVE_SEGMENT_BYTES = 256 * 1024**2
+ARCHIVE_ZSTD_LEVEL = 10
+REPARSE_BATCH = 64   # archived bodies handed to a reparse worker at a time
 data_key_dict = { # match on the 'id' field
     'award_agency': 'agencyID',
     'award_procurement_id': 'PIID',
@@ -60,6 +144,32 @@ data_key_dict = { # match on the 'id' field
     'performance_zip': 'placeOfPerformanceZIPCode',
     'performance_zip_ext': 'placeOfPerformanceZIPCode4',
 }
+TABLE_KEY_COLS = { # stable record identity, used to tell changed rows from new ones
+    'contract': ['piid','fpds_link'],
+    'grant': ['link'],
+    'property': ['date','location','agency'],
+}
+DATA_DIR = './data'
+STORAGE_BACKENDS = ['csv','parquet','cdc']
+CDC_META = ['_key','_op','_valid_from']
+FP_INDEX_CHUNK = 200_000    # history rows read at a time while building a fingerprint index
+TABLE_TYPES = { # explicit column types, in memory and for the parquet backend. anything not listed stays a string.
+    # 'date' columns are datetime64 in memory but kept as text on disk, 'category' is stored as a plain string
+    # the contract listing's own date stays a string: it also carries notes like 'Termination in progress'
+    'contract': {'value': 'float64', 'savings': 'float64', 'ceiling_value': 'float64', 'uploaded_dt': 'timestamp', 'update_date': 'date',
+        'agency': 'category', 'vendor': 'category', 'fpds_status': 'category',
+        **{k: 'float64' for k in data_key_dict if 'amount' in k},
+        **{k: 'date' for k in data_key_dict if k.startswith('date')},
+        **{k: 'category' for k in ['award_agency','ref_idv_agency','entity_name','entity_state','entity_county','entity_county_disp',
+            'product_service_code','product_service_desc','principal_naics_code','principal_naics_desc','performance_state',
+            'performance_country','performance_county']}},
+    'grant': {'value': 'float64', 'savings': 'float64', 'uploaded_dt': 'timestamp', 'date': 'date',
+        'agency': 'category', 'recipient': 'category', 'total_obligation': 'float64', 'date_signed': 'date',
+        'awarding_agency_toptier_agency_name': 'category', 'awarding_agency_subtier_agency_name': 'category',
+        'recipient_location_state_code': 'category', 'type_description': 'category'},
+    'property': {'value': 'int64', 'savings': 'int64', 'sq_ft': 'int64', 'uploaded_dt': 'timestamp', 'date': 'date',
+        'agency': 'category', 'location': 'category', 'city': 'category', 'state': 'category'},
+}
 
 def safe_load_csv(filepath):
     df = pd.read_csv(filepath) if os.path.exists(filepath) else pd.DataFrame([])
@@ -67,62 +177,1052 @@ def safe_load_csv(filepath):
         df['uploaded_dt'] = pd.to_datetime(df['uploaded_dt'])
     return df
 
-def clean_pre_df(df):
+def clean_pre_df(df,name=None):
+    # with a table name the columns get their TABLE_TYPES, and missing values stay missing instead of ''
+    if name is not None:
+        return apply_schema(df,name)
     df = df.fillna('')
     return df
 
-def load_pre_data():
-    pre_contract_df = safe_load_csv('./data/doge-contract.csv')
-    pre_contract_df = clean_pre_df(pre_contract_df)
-    pre_grant_df = safe_load_csv('./data/doge-grant.csv')
-    pre_grant_df = clean_pre_df(pre_grant_df)
-    pre_property_df = safe_load_csv('./data/doge-property.csv')
-    pre_property_df = clean_pre_df(pre_property_df)
+def to_amount_col(s):
+    if pd.api.types.is_numeric_dtype(s):
+        return s.astype('float64')
+    return pd.to_numeric(s.astype(str).str.replace(r'[$,]','',regex=True),errors='coerce')    # FPDS writes '$1,234.50'
+
+def apply_schema(df,name):
+    for c, kind in TABLE_TYPES[name].items():
+        if c not in df.keys():
+            continue
+        s = df[c]
+        if s.dtype == object or pd.api.types.is_string_dtype(s):
+            s = s.mask(s.astype(object).eq(''))
+        if kind == 'float64':
+            df[c] = to_amount_col(s)
+        elif kind == 'int64':
+            f = to_amount_col(s)
+            df[c] = f.astype('Int64') if (f.dropna() % 1 == 0).all() else f
+        elif kind in ('timestamp','date'):
+            if not pd.api.types.is_datetime64_any_dtype(s):
+                dt = to_dt_col(s)
+                if kind == 'date' and date_format_cache.get(s.name):
+                    df.attrs.setdefault('date_formats',{})[c] = date_text_format(s,date_format_cache[s.name])
+                df[c] = pd.to_datetime(dt,errors='coerce')
+        elif kind == 'category':
+            if isinstance(s.dtype,pd.CategoricalDtype):
+                df[c] = s.cat.remove_categories([''] if '' in s.cat.categories else [])
+            else:
+                df[c] = s.astype('category')
+    return df
+
+def date_text_format(s,fmt):
+    # strptime reads 3/13/2025 and 03/13/2025 alike, so also check whether the source pads months and days
+    sample = s.dropna().astype(str)
+    sample = sample[sample != ''].head(1000)
+    if '/' in fmt and sample.str.contains(r'(?:^|/)\d/').any():
+        fmt = fmt.replace('%m','%-m').replace('%d','%-d')
+    return fmt
+
+def text_date_formats(head,name):
+    # strftime formats of the 'date' columns in rows of text, for the columns that have any values
+    formats = {}
+    for c in [c for c, kind in TABLE_TYPES[name].items() if kind == 'date' and c in head.keys()]:
+        sample = head[c].dropna()
+        sample = sample[sample != '']
+        hits = {fmt: pd.to_datetime(sample,format=fmt,errors='coerce').notna().mean() for fmt in DATE_FORMATS} if len(sample) else {}
+        if hits and max(hits.values()) > 0.9:
+            formats[c] = date_text_format(sample,max(hits,key=hits.get))
+    return formats
+
+def stored_date_formats(name,path=None,nrows=1000):
+    # how the 'date' columns already on disk are written, from the first rows of the csv at path, or without
+    # one the table's first parquet part. what is on disk wins over the formats a frame was parsed from
+    dates = [c for c, kind in TABLE_TYPES[name].items() if kind == 'date']
+    if path is not None:
+        cols = [c for c in csv_header(path) or [] if c in dates]
+        return text_date_formats(pd.read_csv(path,usecols=cols,dtype=str,nrows=nrows),name) if cols else {}
+    parts = parquet_parts(name)
+    if not parts:
+        return {}
+    _, pq = import_pyarrow()
+    pf = pq.ParquetFile(parts[0])
+    cols = [c for c in pf.schema_arrow.names if c in dates]
+    return text_date_formats(pf.read_row_group(0,columns=cols).slice(0,nrows).to_pandas(),name) if cols else {}
+
+def date_text(s,fmt=None):
+    # a 'date' column back to the text it was read as, or ISO when that is unknown
+    text = s.dt.strftime(fmt) if fmt else s.dt.strftime('%Y-%m-%d %H:%M:%S').str.removesuffix(' 00:00:00')
+    return text.astype(object).where(s.notna(),None)
+
+def csv_frame(df,name,path=None):
+    # 'date' columns are datetime64 in memory only, on disk they keep the text of the csv at path (when it
+    # exists) or else of the source they were parsed from
+    dates = [c for c, kind in TABLE_TYPES[name].items() if kind == 'date' and c in df.keys() and pd.api.types.is_datetime64_any_dtype(df[c])]
+    if not dates:
+        return df
+    formats = {**df.attrs.get('date_formats',{}),**(stored_date_formats(name,path) if path and os.path.exists(path) else {})}
+    return df.assign(**{c: date_text(df[c],formats.get(c)) for c in dates})
+
+def import_pyarrow():
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ImportError('the parquet storage backend needs pyarrow: pip install pyarrow')
+    return pa, pq
+
+def parquet_dir(name):
+    return os.path.join(DATA_DIR,'parquet',f'doge-{name}')
+
+def parquet_parts(name):
+    pdir = parquet_dir(name)
+    return sorted(os.path.join(pdir,f) for f in os.listdir(pdir) if f.endswith('.parquet')) if os.path.isdir(pdir) else []
+
+def arrow_table(df,name):
+    pa, _ = import_pyarrow()
+    cols, fields = {}, []
+    formats = {**df.attrs.get('date_formats',{}),**stored_date_formats(name)}
+    for c in df.keys():
+        kind = TABLE_TYPES[name].get(c,'string')
+        s = df[c].mask(df[c].astype(object).eq(''))    # '' is clean_pre_df's stand-in for a missing value
+        if kind == 'float64':
+            cols[c] = to_amount_col(s)
+            fields.append(pa.field(c,pa.float64()))
+        elif kind == 'int64':
+            cols[c] = to_amount_col(s).astype('Int64')
+            fields.append(pa.field(c,pa.int64()))
+        elif kind == 'timestamp':
+            cols[c] = pd.to_datetime(s,errors='coerce').astype('datetime64[us]')
+            fields.append(pa.field(c,pa.timestamp('us')))
+        elif kind == 'date' and pd.api.types.is_datetime64_any_dtype(s):
+            cols[c] = date_text(s,formats.get(c))
+            fields.append(pa.field(c,pa.string()))
+        else:
+            v = fp_norm_col(s) if not pd.api.types.is_datetime64_any_dtype(s) else s.astype(str)
+            cols[c] = v.where(v != '',None)
+            fields.append(pa.field(c,pa.string()))
+    return pa.Table.from_pandas(pd.DataFrame(cols,index=df.index),schema=pa.schema(fields),preserve_index=False)
+
+def load_parquet(name):
+    pa, pq = import_pyarrow()
+    parts = parquet_parts(name)
+    if not parts:
+        return None
+    # column types are fixed by TABLE_TYPES, so parts only differ by columns added later, which come back null
+    return pa.concat_tables([pq.read_table(fp) for fp in parts],promote_options='default').to_pandas()
+
+def save_parquet(df,name,tag,rewrite=False):
+    # tables only ever grow by rows appended at the end, so a save writes just the rows past what is
+    # already on disk as a new part. a shrunk table, or rewrite for rows changed in place, rewrites the dataset
+    _, pq = import_pyarrow()
+    pdir = parquet_dir(name)
+    os.makedirs(pdir,exist_ok=True)
+    parts = parquet_parts(name)
+    n_stored = sum(pq.read_metadata(fp).num_rows for fp in parts)
+    if rewrite or n_stored > len(df):
+        for fp in parts:
+            os.remove(fp)
+        parts, n_stored = [], 0
+    if len(df) > n_stored or not parts:
+        pq_write_part(df.iloc[n_stored:],name,tag)
+
+def pq_write_part(df,name,tag):
+    _, pq = import_pyarrow()
+    os.makedirs(parquet_dir(name),exist_ok=True)
+    pq.write_table(arrow_table(df,name),os.path.join(parquet_dir(name),f'part-{len(parquet_parts(name)):05d}-{tag}.parquet'))
+
+def cdc_dir(name):
+    return os.path.join(DATA_DIR,'cdc',f'doge-{name}')
+
+def cdc_parts(name):
+    cdir = cdc_dir(name)
+    return sorted(os.path.join(cdir,f) for f in os.listdir(cdir) if f.endswith('.csv')) if os.path.isdir(cdir) else []
+
+def tag_to_dt(tag):
+    dt = pd.to_datetime(tag,format='%Y-%m-%d-%H%M',errors='coerce')
+    return pd.Timestamp.now().floor('min') if pd.isna(dt) else dt
+
+def record_keys(df,name,by=None):
+    # stable identity from TABLE_KEY_COLS, as a hex string. rows without any key value fall back to their
+    # full-row fingerprint. a key repeated within one listing (or within one `by` group, e.g. one scrape
+    # of the history) gets its occurrence number mixed in, so genuine duplicates stay separate records
+    data_cols = [c for c in df.keys() if c not in CDC_META + ['dt_scrape']]
+    key_cols = [k for k in TABLE_KEY_COLS[name] if k in df.keys()]
+    norm = fp_norm_df(df,key_cols)
+    keys = fp_hash(norm).copy()
+    no_key = ~(norm != '').any(axis=1).values if key_cols else np.ones(len(df),dtype=bool)
+    if no_key.any():
+        keys[no_key] = row_fingerprint(df[no_key],data_cols)
+    occ = pd.DataFrame({'k': keys,'g': df[by].values if by else 0}).groupby(['k','g']).cumcount().values
+    if (occ > 0).any():
+        keys[occ > 0] = fp_hash(pd.DataFrame({'k': keys[occ > 0].astype(str),'o': occ[occ > 0].astype(str)}))
+    return pd.Series(keys,index=df.index).map('{:016x}'.format)
+
+def cdc_events(name):
+    # every insert/update/delete event so far, in the order they were written
+    parts = cdc_parts(name)
+    if not parts:
+        return None
+    events = pd.concat([pd.read_csv(fp,dtype={'_key': str}) for fp in parts],ignore_index=True)
+    events['_valid_from'] = pd.to_datetime(events['_valid_from'])
+    return apply_schema(events,name)
+
+def cdc_history(events,as_of=None):
+    # every version of every record with when it became current and when it stopped being (_valid_to, NaT
+    # while it still is). with as_of, only events up to that time count
+    if as_of is not None:
+        events = events[events._valid_from <= pd.Timestamp(as_of)]
+    return events.assign(_valid_to=events.groupby('_key')._valid_from.shift(-1))
+
+def cdc_current(events,as_of=None):
+    # the versions still valid (at as_of), minus deleted records
+    history = cdc_history(events,as_of)
+    current = history[history._valid_to.isna() & (history._op != 'delete')]
+    return current.drop(columns=['_op','_valid_from','_valid_to']).reset_index(drop=True)
+
+def cdc_write(events,name,tag):
+    os.makedirs(cdc_dir(name),exist_ok=True)
+    csv_frame(events,name,cdc_parts(name)[0] if cdc_parts(name) else None).to_csv(
+        os.path.join(cdc_dir(name),f'events-{len(cdc_parts(name)):05d}-{tag}.csv'),index=False)
+
+def cdc_seed(df,name):
+    # a new event log starts from the csv history: each scrape's rows become inserts, or updates of a key seen before
+    events = df.assign(_key=record_keys(df,name,by='dt_scrape' if 'dt_scrape' in df.keys() else None).values)
+    events['_op'] = np.where(events._key.duplicated(),'update','insert')
+    events['_valid_from'] = [tag_to_dt(t) for t in events['dt_scrape']] if 'dt_scrape' in events.keys() else tag_to_dt('')
+    cdc_write(events,name,'seed')
+    return events
+
+def cdc_split(cur_df,stub_df,name):
+    # key lookups instead of whole-table row matching: stub rows whose key is new or whose listed values
+    # changed need (re)enrichment, and keys missing from the stub were deleted upstream
+    stub_df = stub_df.assign(_key=record_keys(stub_df,name).values)
+    if not len(cur_df):
+        return stub_df, pd.Series([],dtype=str)
+    cols = [c for c in stub_df.keys() if c != '_key']
+    pos = pd.Index(cur_df._key).get_indexer(stub_df._key)
+    same = (pos >= 0) & (row_fingerprint(cur_df,cols)[pos] == row_fingerprint(stub_df,cols))
+    deleted = cur_df._key[~cur_df._key.isin(stub_df._key)]
+    return stub_df[~same].copy(), deleted
+
+def cdc_apply(cur_df,changed_df,deleted=()):
+    # next current state: changed rows replace their key's row, deleted keys drop out
+    if not len(cur_df):
+        return changed_df.reset_index(drop=True)
+    drop = cur_df._key.isin(changed_df._key) | cur_df._key.isin(deleted)
+    return pd.concat([cur_df[~drop],changed_df],ignore_index=True)
+
+def cdc_delta(cur_df,df):
+    cols = [c for c in df.keys() if c not in CDC_META + ['dt_scrape']]
+    pos = pd.Index(cur_df._key).get_indexer(df._key)
+    known = pos >= 0
+    changed = ~known
+    if known.any():
+        changed |= known & (row_fingerprint(cur_df,cols)[pos] != row_fingerprint(df,cols))
+    deleted = cur_df._key[~cur_df._key.isin(df._key)]
+    return df[changed & ~known], df[changed & known], deleted
+
+def load_cdc(name):
+    events = cdc_events(name)
+    if events is None:
+        df = safe_load_csv(os.path.join(DATA_DIR,f'doge-{name}.csv'))
+        if not len(df):
+            return df
+        events = apply_schema(cdc_seed(df,name),name)
+    return cdc_current(events)
+
+def save_cdc(df,name,tag):
+    # only the difference to the stored current state is written, as one more events part
+    if '_key' not in df.keys():
+        df = df.assign(_key=record_keys(df,name).values)
+    events = cdc_events(name)
+    cur_df = cdc_current(events) if events is not None else pd.DataFrame({'_key': pd.Series([],dtype=str)})
+    inserted, updated, deleted = cdc_delta(cur_df,df)
+    delta = pd.concat([inserted.assign(_op='insert'),updated.assign(_op='update'),pd.DataFrame({'_key': deleted.values,'_op': 'delete'})],
+        ignore_index=True)
+    if len(delta):
+        delta['_valid_from'] = tag_to_dt(tag)
+        cdc_write(delta,name,tag)
+    return delta
+
+def load_table(name,backend='csv'):
+    if backend == 'parquet':
+        df = load_parquet(name)
+        if df is not None:
+            return df
+    if backend == 'cdc':
+        return load_cdc(name)
+    return safe_load_csv(os.path.join(DATA_DIR,f'doge-{name}.csv'))    # csv backend, or seeding a new parquet dataset
+
+def save_table(df,name,backend='csv',export_csv=True,tag='0',rewrite=False):
+    # rewrite: existing rows changed, not just new ones added (csv is always rewritten, cdc diffs by key)
+    if backend != 'cdc':
+        drop_fp_index(name)   # the history may change anywhere, not just at the end
+    if backend == 'parquet':
+        save_parquet(df,name,tag,rewrite)
+    if backend == 'cdc':
+        save_cdc(df,name,tag)
+        if export_csv:  # every version of every record, like the appended csv history
+            events = cdc_events(name)
+            csv_path = os.path.join(DATA_DIR,f'doge-{name}.csv')
+            csv_frame(events[events._op != 'delete'].drop(columns=CDC_META),name,csv_path).to_csv(csv_path,index=False)
+        return
+    if backend == 'csv' or export_csv:
+        csv_path = os.path.join(DATA_DIR,f'doge-{name}.csv')
+        csv_frame(df,name,csv_path).to_csv(csv_path,index=False)
+
+def fp_index_path(name,ext):
+    return os.path.join(DATA_DIR,'index',f'doge-{name}.{ext}')
+
+def file_signature(fp,size=None,block=1 << 16,samples=16):
+    # byte length and one sha1 over evenly spaced blocks of the file's first size bytes, the last block ending
+    # at size. about a MB is read however long the file is, and appending leaves the covered bytes' signature alone
+    size = os.path.getsize(fp) if size is None else size
+    h = hashlib.sha1()
+    with open(fp,'rb') as f:
+        for at in sorted({min(i * size // samples,max(size - block,0)) for i in range(samples)} | {max(size - block,0)}):
+            f.seek(at)
+            h.update(f.read(min(block,size - at)))
+    return [size,h.hexdigest()]
+
+def history_signature(name,backend='csv'):
+    # what a fingerprint index was built from, by content so a fresh checkout of the same history still matches.
+    # save_table drops the index on any other write to the history than append_table
+    if backend == 'parquet' and parquet_parts(name):
+        return [[os.path.basename(fp)] + file_signature(fp) for fp in parquet_parts(name)]
+    fp = os.path.join(DATA_DIR,f'doge-{name}.csv')
+    return file_signature(fp) if os.path.exists(fp) else None
+
+def iter_history(name,backend='csv',chunksize=FP_INDEX_CHUNK):
+    # the stored history a slice at a time. csv cells are read as text so every slice types the same way
+    if backend == 'parquet' and parquet_parts(name):
+        _, pq = import_pyarrow()
+        for fp in parquet_parts(name):
+            for batch in pq.ParquetFile(fp).iter_batches(batch_size=chunksize):
+                yield clean_pre_df(batch.to_pandas(),name)
+        return
+    fp = os.path.join(DATA_DIR,f'doge-{name}.csv')
+    if csv_header(fp) is None:
+        return
+    for chunk in pd.read_csv(fp,dtype=str,chunksize=chunksize):
+        yield clean_pre_df(chunk,name)
+
+def fp_index_types(name,cols):
+    # fingerprints depend on how each column is typed, so a TABLE_TYPES change makes an index stale too
+    return [TABLE_TYPES[name].get(c,'string') for c in cols]
+
+def fp_index_fits(meta,name,cols):
+    return meta['cols'] == list(cols) and meta.get('types') == fp_index_types(name,cols)
+
+def write_fp_index(name,sorted_fp,order,cols,backend,source):
+    os.makedirs(os.path.dirname(fp_index_path(name,'json')),exist_ok=True)
+    for ext, arr in [('fp.npy',sorted_fp),('pos.npy',order)]:
+        with open(fp_index_path(name,ext) + '.tmp','wb') as f:
+            np.save(f,np.asarray(arr))
+        os.replace(fp_index_path(name,ext) + '.tmp',fp_index_path(name,ext))
+    meta = {'cols': list(cols),'types': fp_index_types(name,cols),'n_rows': len(sorted_fp),'backend': backend,'source': source}
+    with open(fp_index_path(name,'json'),'w') as f:   # written last, so a torn index never looks current
+        json.dump(meta,f)
+
+def read_fp_index_meta(name):
+    try:
+        with open(fp_index_path(name,'json')) as f:
+            return json.load(f)
+    except (OSError,ValueError):
+        return None
+
+def fp_index_meta(name,backend='csv'):
+    meta = read_fp_index_meta(name)
+    if meta is None or meta['backend'] != backend or not fp_index_fits(meta,name,meta['cols']):
+        return None
+    return meta if meta['source'] == history_signature(name,backend) else None
+
+def drop_fp_index(name):
+    if os.path.exists(fp_index_path(name,'json')):
+        os.remove(fp_index_path(name,'json'))
+
+def catch_up_fp_index(name,cols,backend='csv'):
+    # an index of an earlier version of the csv, which has since only had rows appended (a pulled commit, an
+    # index restored from an older cache), is extended from just the bytes past what it covers
+    meta = read_fp_index_meta(name)
+    fp = os.path.join(DATA_DIR,f'doge-{name}.csv')
+    if backend != 'csv' or meta is None or meta['backend'] != 'csv' or not fp_index_fits(meta,name,cols) or not meta['source']:
+        return None
+    if not os.path.exists(fp) or os.path.getsize(fp) <= meta['source'][0] or file_signature(fp,meta['source'][0]) != meta['source']:
+        return None
+    with open(fp,'rb') as f:
+        f.seek(meta['source'][0])
+        new_df = pd.read_csv(f,header=None,names=csv_header(fp),dtype=str)
+    extend_fp_index(name,clean_pre_df(new_df,name),meta,backend)
+    return fp_index_meta(name,backend)
+
+def build_fp_index(name,cols,backend='csv'):
+    source = history_signature(name,backend)
+    fps = [row_fingerprint(chunk,cols) for chunk in iter_history(name,backend)]
+    fp = np.concatenate(fps) if fps else np.array([],dtype=np.uint64)
+    order = np.argsort(fp,kind='stable').astype(np.int64)
+    write_fp_index(name,fp[order],order,cols,backend,source)
+
+def load_fp_index(name,cols,backend='csv'):
+    # sorted 64-bit fingerprints of every history row over cols, with each one's row position, memory-mapped.
+    # caught up on appended rows, or built from one chunked pass over the history when missing, stale, or over
+    # other columns
+    meta = fp_index_meta(name,backend) or catch_up_fp_index(name,cols,backend)
+    if meta is None or not fp_index_fits(meta,name,cols):
+        build_fp_index(name,cols,backend)
+        meta = fp_index_meta(name,backend)
+    mmap = 'r' if meta['n_rows'] else None
+    return np.load(fp_index_path(name,'fp.npy'),mmap_mode=mmap), np.load(fp_index_path(name,'pos.npy'),mmap_mode=mmap)
+
+def extend_fp_index(name,new_df,meta,backend='csv'):
+    # merge the appended rows' fingerprints into the sorted index instead of rebuilding it
+    sorted_fp, order = [np.load(fp_index_path(name,ext),mmap_mode='r' if meta['n_rows'] else None) for ext in ['fp.npy','pos.npy']]
+    new_fp = row_fingerprint(new_df,meta['cols'])
+    new_order = np.argsort(new_fp,kind='stable')
+    at = np.searchsorted(sorted_fp,new_fp[new_order],side='right')
+    write_fp_index(name,np.insert(sorted_fp,at,new_fp[new_order]),np.insert(order,at,meta['n_rows'] + new_order),
+        meta['cols'],backend,history_signature(name,backend))
+
+def fp_index_match(name,df,cols,backend='csv'):
+    return fp_lookup(*load_fp_index(name,cols,backend),row_fingerprint(df,cols))
+
+def df_row_diff_index(name,stub_df,backend='csv'):
+    # df_row_diff_3 against the on-disk fingerprint index, so the history itself is never loaded
+    match, drop_idx = fp_index_match(name,stub_df,list(stub_df.columns),backend)
+    return stub_df[~match].copy(), drop_idx
+
+def csv_header(path):
+    try:
+        return list(pd.read_csv(path,nrows=0).columns)
+    except (OSError,pd.errors.EmptyDataError):
+        return None
+
+def append_table(new_df,name,backend='csv',export_csv=True,tag='0'):
+    # add rows to the csv or parquet history without loading it: the csv gets them appended under its
+    # header, parquet one more part, and a current fingerprint index is extended. seeding a parquet
+    # dataset, or a new column the csv header lacks, falls back to a full save
+    if not len(new_df):
+        return
+    meta = fp_index_meta(name,backend)
+    csv_path = os.path.join(DATA_DIR,f'doge-{name}.csv')
+    write_csv = backend == 'csv' or export_csv
+    header = csv_header(csv_path) if write_csv else None
+    if (backend == 'parquet' and not parquet_parts(name)) or (header is not None and not set(new_df.keys()) <= set(header)):
+        save_table(combine_tables(clean_pre_df(load_table(name,backend),name),new_df,name,backend),name,backend,export_csv,tag)
+    else:
+        if backend == 'parquet':
+            pq_write_part(new_df,name,tag)
+        if write_csv and header is None:
+            csv_frame(new_df,name).to_csv(csv_path,index=False)
+        elif write_csv:
+            csv_frame(new_df,name,csv_path).reindex(columns=header).to_csv(csv_path,mode='a',header=False,index=False)
+    if meta is not None:
+        extend_fp_index(name,new_df,meta,backend)
+
+def load_pre_data(backend='csv'):
+    pre_contract_df = load_table('contract',backend)
+    pre_contract_df = clean_pre_df(pre_contract_df,'contract')
+    pre_grant_df = load_table('grant',backend)
+    pre_grant_df = clean_pre_df(pre_grant_df,'grant')
+    pre_property_df = load_table('property',backend)
+    pre_property_df = clean_pre_df(pre_property_df,'property')
     return pre_contract_df, pre_grant_df, pre_property_df
 
-@sleep_and_retry
-@limits(calls=N_REQ,period=LIMIT_S)
-def limit_req(url,headers={}):
-    r = req.get(url,headers=headers)
-    if r.status_code != 200:
-        raise Exception('API response: {}'.format(r.status_code))
+def peak_rss_mb(reset=False):
+    # VmHWM can be reset per stage on linux; elsewhere fall back to the peak for the whole process
+    try:
+        if reset:
+            with open('/proc/self/clear_refs','w') as f:
+                f.write('5')
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    import resource
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+class RunMetrics:
+    # wall/cpu time and peak memory per pipeline stage, plus request counts, status codes, latency
+    # histograms and rate limiter sleep per host. written out as the run report
+    def __init__(self,profile_stages=(),profile_dir=RUNLOG_DIR):
+        self.lock = threading.Lock()
+        self.stages = {}
+        self.hosts = {}
+        self.profile_stages = set(profile_stages)
+        self.profile_dir = profile_dir
+        self.t_start = time()
+        self.startup_s = None
+
+    def host(self,url):
+        host = urlparse(url).netloc
+        if host not in self.hosts:
+            self.hosts[host] = {'requests': 0,'errors': 0,'cache_hits': 0,'status': {},'latency_s': 0.,'latency_max_s': 0.,
+                'latency_hist': [0] * (len(LATENCY_BUCKETS_S) + 1),'limiter_sleep_s': 0.}
+        return self.hosts[host]
+
+    def record_request(self,url,status,latency):
+        with self.lock:
+            h = self.host(url)
+            h['requests'] += 1
+            h['errors'] += status is None
+            status = str(status or 'error')
+            h['status'][status] = h['status'].get(status,0) + 1
+            h['latency_s'] += latency
+            h['latency_max_s'] = max(h['latency_max_s'],latency)
+            h['latency_hist'][int(np.searchsorted(LATENCY_BUCKETS_S,latency))] += 1
+
+    def record_sleep(self,url,wait):
+        with self.lock:
+            self.host(url)['limiter_sleep_s'] += wait
+
+    def record_cache_hit(self,url):
+        with self.lock:
+            self.host(url)['cache_hits'] += 1
+
+    @contextmanager
+    def stage(self,name):
+        profiler = cProfile.Profile() if name in self.profile_stages else None
+        t_wall, t_cpu, rss_start = monotonic(), process_time(), peak_rss_mb(reset=True)
+        if profiler:
+            profiler.enable()
+        try:
+            yield
+        finally:
+            if profiler:
+                profiler.disable()
+                os.makedirs(self.profile_dir,exist_ok=True)
+                profiler.dump_stats(os.path.join(self.profile_dir,'profile-{}-{}.prof'.format(name,datetime.now().strftime('%Y-%m-%d-%H%M'))))
+            stage = self.stages.setdefault(name,{'wall_s': 0.,'cpu_s': 0.,'rss_start_mb': rss_start,'peak_rss_mb': 0.,'calls': 0})
+            stage['wall_s'] += monotonic() - t_wall
+            stage['cpu_s'] += process_time() - t_cpu
+            stage['peak_rss_mb'] = max(stage['peak_rss_mb'],peak_rss_mb())
+            stage['calls'] += 1
+
+    def report(self):
+        with self.lock:
+            hosts = json.loads(json.dumps(self.hosts))
+        for h in hosts.values():
+            h['latency_mean_s'] = h['latency_s'] / h['requests'] if h['requests'] else None
+            h['latency_hist'] = dict(zip(['<={}'.format(b) for b in LATENCY_BUCKETS_S] + ['>{}'.format(LATENCY_BUCKETS_S[-1])],h['latency_hist']))
+        return {'started': datetime.fromtimestamp(self.t_start).isoformat(timespec='seconds'),'wall_s': time() - self.t_start,
+            'startup_s': self.startup_s,'imports_s': dict(import_times),'stages': self.stages,'hosts': hosts}
+
+    def save(self,tag,path=None):
+        path = path or os.path.join(RUNLOG_DIR,f'report-{tag}.json')
+        os.makedirs(os.path.dirname(path) or '.',exist_ok=True)
+        with open(path,'w') as f:
+            json.dump(self.report(),f,indent=1)
+        return path
+
+run_metrics = RunMetrics()
+
+thread_local = threading.local()
+
+def http_session():
+    # one keep-alive session per worker thread, so repeat requests to a host reuse its connection
+    if not hasattr(thread_local,'session'):
+        thread_local.session = req.Session()
+        adapter = req.adapters.HTTPAdapter(pool_connections=8,pool_maxsize=8)
+        thread_local.session.mount('https://',adapter)
+        thread_local.session.mount('http://',adapter)
+    return thread_local.session
+
+def session_get(url,**kwargs):
+    t0 = monotonic()
+    try:
+        r = http_session().get(url,timeout=REQ_TIMEOUT,**kwargs)
+    except Exception:
+        run_metrics.record_request(url,None,monotonic() - t0)
+        raise
+    run_metrics.record_request(url,r.status_code,monotonic() - t0)
+    return r
+
+class TokenBucket:
+    def __init__(self,rate,burst):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.t_last = monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        # reserve a token under the lock, then sleep off any debt outside it so waiters queue fairly
+        with self.lock:
+            now = monotonic()
+            self.tokens = min(self.burst,self.tokens + (now - self.t_last) * self.rate)
+            self.t_last = now
+            self.tokens -= 1
+            wait = -self.tokens / self.rate if self.tokens < 0 else 0.
+        if wait > 0:
+            sleep(wait)
+        return wait
+
+    def set_rate(self,rate):
+        with self.lock:
+            self.rate = rate
+
+def parse_retry_after(value):
+    # seconds or an http date, None when absent or unreadable
+    if not value:
+        return None
+    try:
+        seconds = float(value)
+    except ValueError:
+        try:
+            when = parsedate_to_datetime(value)
+        except (TypeError,ValueError):
+            return None
+        seconds = (when - datetime.now(tz=when.tzinfo)).total_seconds()
+    return min(max(seconds,0.),MAX_RETRY_AFTER_S)
+
+class HostLimiter:
+    # token bucket plus a cap on requests in flight. the rate adapts within [min_rate, max_rate]: halved on
+    # a 429/503 (with the whole host paused for any Retry-After), cut by 10% when latency passes
+    # latency_target, and raised by about step per second while requests succeed. a burst of 429s from requests that
+    # were already in flight counts as one signal, so cuts are at least cut_interval_s apart
+    def __init__(self,rate,burst,min_rate=None,max_rate=None,max_inflight=DEFAULT_MAX_INFLIGHT,latency_target=None):
+        self.bucket = TokenBucket(rate,burst)
+        self.min_rate = min_rate or rate / 8
+        self.max_rate = max(max_rate or rate,rate)
+        self.step = self.max_rate / 20
+        self.inflight = threading.BoundedSemaphore(max_inflight)
+        self.latency_target = latency_target
+        self.paused_until = 0.
+        self.t_cut = 0.
+        self.cut_interval_s = 1.
+        self.lock = threading.Lock()
+
+    def cut(self,factor):
+        now = monotonic()
+        if now - self.t_cut >= self.cut_interval_s:
+            self.t_cut = now
+            self.bucket.set_rate(max(self.min_rate,self.rate * factor))
+
+    @property
+    def rate(self):
+        return self.bucket.rate
+
+    def acquire(self):
+        waited = 0.
+        while True:
+            with self.lock:
+                pause = self.paused_until - monotonic()
+            if pause <= 0:
+                break
+            sleep(pause)
+            waited += pause
+        waited += self.bucket.acquire()
+        t0 = monotonic()
+        self.inflight.acquire()
+        return waited + monotonic() - t0
+
+    def release(self,status,latency,retry_after=None):
+        self.inflight.release()
+        with self.lock:
+            if status in (429, 503):
+                self.cut(0.5)
+                if retry_after:
+                    self.paused_until = max(self.paused_until,monotonic() + retry_after)
+            elif self.latency_target and latency > self.latency_target:
+                self.cut(0.9)
+            elif status is not None and status < 400:
+                self.bucket.set_rate(min(self.max_rate,self.rate + self.step / self.rate))  # about +step per second
+
+date_format_cache = {}
+host_limiters = {}
+host_limiters_lock = threading.Lock()
+
+def host_limiter(url):
+    host = urlparse(url).netloc
+    with host_limiters_lock:
+        if host not in host_limiters:
+            host_limiters[host] = HostLimiter(*HOST_RATES.get(host,DEFAULT_HOST_RATE),**HOST_LIMITS.get(host,{}))
+        return host_limiters[host]
+
+def polite_get(url,headers={},params=None,retries=HTTP_RETRIES):
+    # every request goes through its host's limiter. a 429, 5xx or dropped connection is retried with
+    # jittered exponential backoff, or after the server's Retry-After when that is longer
+    limiter = host_limiter(url)
+    for attempt in range(retries + 1):
+        run_metrics.record_sleep(url,limiter.acquire())
+        t0 = monotonic()
+        try:
+            r = session_get(url,headers=headers,params=params)
+        except req.RequestException:
+            limiter.release(None,monotonic() - t0)
+            if attempt == retries:
+                raise
+            backoff_sleep(attempt)
+            continue
+        retry_after = parse_retry_after(r.headers.get('Retry-After'))
+        limiter.release(r.status_code,monotonic() - t0,retry_after)
+        if r.status_code not in RETRY_STATUSES or attempt == retries:
+            return r
+        backoff_sleep(attempt,retry_after)
+
+class CacheMiss(Exception):
+    pass
+
+def normalize_url(url):
+    u = urlparse(url.strip())
+    query = urlencode(sorted(parse_qsl(u.query,keep_blank_values=True)))
+    return urlunparse((u.scheme.lower(),u.netloc.lower(),u.path or '/','',query,''))
+
+def cached_response(url,body,etag,last_modified):
+    r = req.models.Response()
+    r._content = body
+    r.status_code = 200
+    r.url = url
+    r.encoding = 'utf-8' if body[:1] in (b'{',b'[') else None
+    r.headers = req.structures.CaseInsensitiveDict({k: v for k, v in [('ETag',etag),('Last-Modified',last_modified)] if v})
+    r.from_cache = True
     return r
 
+class HttpCache:
+    # responses are keyed by normalized url and point at zlib-compressed bodies keyed by their sha256,
+    # so identical pages are stored once. least recently used entries go first when over max_bytes
+    def __init__(self,path=CACHE_PATH,ttl=CACHE_TTL_S,max_bytes=CACHE_MAX_BYTES,offline=False):
+        os.makedirs(os.path.dirname(path) or '.',exist_ok=True)
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.offline = offline
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(path,check_same_thread=False,isolation_level=None)
+        self.db.execute('PRAGMA journal_mode=WAL')
+        self.db.execute('CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, content_hash TEXT, etag TEXT, last_modified TEXT, fetched_at REAL, accessed_at REAL)')
+        self.db.execute('CREATE TABLE IF NOT EXISTS blobs (content_hash TEXT PRIMARY KEY, body BLOB, size INTEGER)')
+        self.db.execute('CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed_at)')
+        self.total_bytes = self.db.execute('SELECT COALESCE(SUM(size),0) FROM blobs').fetchone()[0]
+
+    def lookup(self,key):
+        with self.lock:
+            return self.db.execute(
+                'SELECT r.content_hash, r.etag, r.last_modified, r.fetched_at, b.body FROM responses r JOIN blobs b USING (content_hash) WHERE r.key = ?',
+                (key,)).fetchone()
+
+    def touch(self,key,fetched_at=None):
+        with self.lock:
+            if fetched_at is None:
+                self.db.execute('UPDATE responses SET accessed_at = ? WHERE key = ?',(time(),key))
+            else:
+                self.db.execute('UPDATE responses SET accessed_at = ?, fetched_at = ? WHERE key = ?',(time(),fetched_at,key))
+
+    def store(self,key,r):
+        body = zlib.compress(r.content)
+        content_hash = hashlib.sha256(r.content).hexdigest()
+        now = time()
+        with self.lock:
+            self.db.execute('BEGIN')
+            if self.db.execute('INSERT OR IGNORE INTO blobs VALUES (?,?,?)',(content_hash,body,len(body))).rowcount:
+                self.total_bytes += len(body)
+            self.db.execute('INSERT OR REPLACE INTO responses VALUES (?,?,?,?,?,?)',
+                (key,content_hash,r.headers.get('ETag'),r.headers.get('Last-Modified'),now,now))
+            self.db.execute('COMMIT')
+            if self.total_bytes > self.max_bytes:
+                self.evict()
+
+    def evict(self):
+        while self.total_bytes > self.max_bytes:
+            keys = self.db.execute('SELECT key FROM responses ORDER BY accessed_at LIMIT 8').fetchall()
+            if not keys:
+                break
+            self.db.execute('BEGIN')
+            self.db.executemany('DELETE FROM responses WHERE key = ?',keys)
+            self.db.execute('DELETE FROM blobs WHERE content_hash NOT IN (SELECT content_hash FROM responses)')
+            self.db.execute('COMMIT')
+            self.total_bytes = self.db.execute('SELECT COALESCE(SUM(size),0) FROM blobs').fetchone()[0]
+
+    def get(self,url,headers={},getter=None):
+        key = normalize_url(url)
+        row = self.lookup(key)
+        if row is not None and (self.offline or time() - row[3] < self.ttl):
+            self.touch(key)
+            return cached_response(url,zlib.decompress(row[4]),row[1],row[2])
+        if self.offline:
+            raise CacheMiss(url)
+        cond_headers = {}
+        if row is not None and row[1]:
+            cond_headers['If-None-Match'] = row[1]
+        if row is not None and row[2]:
+            cond_headers['If-Modified-Since'] = row[2]
+        r = (getter or polite_get)(url,headers={**headers,**cond_headers})
+        if r.status_code == 304 and row is not None:
+            self.touch(key,fetched_at=time())
+            return cached_response(url,zlib.decompress(row[4]),row[1],row[2])
+        if r.status_code == 200:
+            self.store(key,r)
+        return r
+
+http_cache = None
+
+def cached_get(url,headers={},getter=None):
+    if http_cache is None:
+        return (getter or polite_get)(url,headers=headers)
+    r = http_cache.get(url,headers=headers,getter=getter)
+    if getattr(r,'from_cache',False):
+        run_metrics.record_cache_hit(url)
+    return r
+
+def import_zstd():
+    try:
+        import zstandard
+    except ImportError:
+        return None
+    return zstandard
+
+def compress_frame(body,codec):
+    if codec == 'zstd':
+        return import_zstd().ZstdCompressor(level=ARCHIVE_ZSTD_LEVEL).compress(body)
+    return zlib.compress(body,9)
+
+def decompress_frame(frame,codec):
+    if codec == 'zstd':
+        zstd = import_zstd()
+        if zstd is None:
+            raise ImportError('this archive holds zstd frames: pip install zstandard')
+        return zstd.ZstdDecompressor().decompress(frame)
+    return zlib.decompress(frame)
+
+def read_archive_index(archive_dir):
+    # the newest entry for each url. a torn last line from a crash is skipped, its frame is never referenced
+    latest = {}
+    path = os.path.join(archive_dir,'index.jsonl')
+    if os.path.exists(path):
+        with open(path) as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue
+                latest[entry['key']] = entry
+    return latest
+
+class RawArchive:
+    # append-only store of every raw upstream body (DOGE pages, FPDS html, USASpending json). each body is
+    # compressed on its own, with zstd when zstandard is installed and zlib otherwise, and appended to the
+    # current segment file; index.jsonl records its segment, offset and length. a body identical to the
+    # newest one stored for its url is skipped
+    def __init__(self,path=ARCHIVE_DIR,segment_bytes=ARCHIVE_SEGMENT_BYTES):
+        os.makedirs(path,exist_ok=True)
+        self.path = path
+        self.segment_bytes = segment_bytes
+        self.codec = 'zlib' if import_zstd() is None else 'zstd'
+        self.lock = threading.Lock()
+        self.latest = {key: entry['sha'] for key, entry in read_archive_index(path).items()}
+        segments = sorted(fn for fn in os.listdir(path) if fn.startswith('raw-'))
+        self.n_segment = int(segments[-1][4:9]) if segments else 1
+        self.f = open(self.segment_path(),'ab')
+        self.index_f = open(os.path.join(path,'index.jsonl'),'a')
+        self.n_stored, self.raw_bytes, self.stored_bytes = 0, 0, 0
+
+    def segment_path(self):
+        return os.path.join(self.path,'raw-{:05d}.seg'.format(self.n_segment))
+
+    def put(self,kind,url,body):
+        key = normalize_url(url)
+        sha = hashlib.sha256(body).hexdigest()
+        if self.latest.get(key) == sha:
+            return False
+        frame = compress_frame(body,self.codec)
+        with self.lock:
+            if self.latest.get(key) == sha:
+                return False
+            if self.f.tell() and self.f.tell() + len(frame) > self.segment_bytes:
+                self.f.close()
+                self.n_segment += 1
+                self.f = open(self.segment_path(),'ab')
+            offset = self.f.tell()
+            self.f.write(frame)
+            self.f.flush()  # the frame is on disk before the index points at it
+            entry = {'key': key,'kind': kind,'segment': os.path.basename(self.segment_path()),'offset': offset,'length': len(frame),
+                'codec': self.codec,'sha': sha,'fetched_at': datetime.now().isoformat(timespec='seconds')}
+            print(json.dumps(entry),file=self.index_f,flush=True)
+            self.latest[key] = sha
+            self.n_stored += 1
+            self.raw_bytes += len(body)
+            self.stored_bytes += len(frame)
+        return True
+
+    def summary(self):
+        return 'archived {} new bodies, {:.1f} MB compressed to {:.1f} MB ({})'.format(
+            self.n_stored,self.raw_bytes / 1e6,self.stored_bytes / 1e6,self.codec)
+
+raw_archive = None
+
+def archive_body(kind,url,body):
+    if raw_archive is not None:
+        raw_archive.put(kind,url,body)
+
 def configure_driver():
+    from selenium.webdriver import Firefox
+    from selenium.webdriver.firefox.options import Options
     op = Options()
     op.add_argument('-headless')
     return Firefox(options=op)
 
 def open_tables(driver):
+    from selenium.webdriver.common.by import By
     buttons = driver.find_elements(By.XPATH,"//*[contains(text(), 'View All ')]")
     [b.click() for b in buttons]
     return driver
 
-def scrape_doge_endpoint(api_root,endpoint_str,params):
-    endpoint_json_list = []
-    p_scrape = True
-    page = 1
-    while p_scrape:
-        r = req.get(os.path.join(api_root,endpoint_str),params={**params,"page":page})
-        _json_list = r.json()['result'][endpoint_str]
-        p_scrape = page < r.json()['meta']['pages']
-        endpoint_json_list.extend(_json_list)
-        page += 1
-    df = pd.DataFrame(endpoint_json_list)
-    df = df.rename(columns={'description': 'description_doge'})
-    return df
+def record_fp(record):
+    return hashlib.sha1(json.dumps(record,sort_keys=True,default=str).encode()).hexdigest()[:16]
+
+def load_scrape_state(path=SCRAPE_STATE_PATH):
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+def save_scrape_state(state,path=SCRAPE_STATE_PATH):
+    with open(path,'w') as f:
+        json.dump(state,f)
+
+def backoff_sleep(attempt,at_least=None):
+    delay = BACKOFF_S * 2**attempt * (0.5 + random.random())
+    sleep(max(delay,at_least or 0.))
+
+def check_doge_page(page_json):
+    if 'result' not in page_json or 'pages' not in page_json.get('meta',{}):
+        raise Exception('malformed page')
+    return page_json
+
+def fetch_doge_page(url,params,raw=False,attempt=0):
+    # a bad status or unparseable body is retried with jittered exponential backoff before giving up. with
+    # raw, the response comes back undecoded with the attempt it took, for the caller to decode and check
+    # once; a malformed one is fetched again by calling this with the next attempt, which backs off first
+    if attempt:
+        backoff_sleep(attempt - 1)
+    for attempt in range(attempt,DOGE_RETRIES):
+        r = None
+        try:
+            r = polite_get(url,params=params,retries=0)  # this loop also retries malformed pages
+            if r.status_code != 200:
+                raise Exception('API response: {}'.format(r.status_code))
+            if raw:
+                return r, attempt
+            page_json = check_doge_page(r.json())
+            archive_body('doge',r.url,r.content)
+            return page_json
+        except Exception as e:
+            if attempt == DOGE_RETRIES - 1:
+                raise Exception(doge_page_error(url,params,e))
+            backoff_sleep(attempt,parse_retry_after(r.headers.get('Retry-After')) if r is not None else None)
+
+def doge_page_error(url,params,e):
+    return '{} page {} failed after {} attempts: {}'.format(url,params.get('page'),DOGE_RETRIES,e)
 
-def scrape_doge():
-    api_root = 'https://api.doge.gov/savings/'
+def page_to_chunk(json_list):
+    # each page becomes a typed column chunk straight away; its decoded dicts are dropped with it
+    chunk = pd.DataFrame(json_list)
+    return chunk.rename(columns={'description': 'description_doge'}), {record_fp(rec) for rec in json_list}
+
+def fetch_doge_chunk(url,params,endpoint_str):
+    return page_to_chunk(fetch_doge_page(url,params)['result'][endpoint_str])
+
+class ChunkSink:
+    # collects page chunks as they arrive, in any order, optionally spilling each one to disk straight
+    # away so only the pages in flight are held while scraping. to_df puts them back in page order
+    def __init__(self,spill_dir=None):
+        self.spill_dir = spill_dir
+        self.chunks = {}
+        if spill_dir:
+            os.makedirs(spill_dir,exist_ok=True)
+
+    def add(self,chunk,page):
+        if self.spill_dir:
+            fp = os.path.join(self.spill_dir,'page-{:05d}.pkl'.format(page))
+            chunk.to_pickle(fp)
+            chunk = fp
+        self.chunks[page] = chunk
+
+    def to_df(self):
+        pages = sorted(self.chunks)
+        if self.spill_dir:
+            chunks = [pd.read_pickle(self.chunks[page]) for page in pages]
+            [os.remove(self.chunks[page]) for page in pages]
+        else:
+            chunks = [self.chunks[page] for page in pages]
+        return pd.concat(chunks,ignore_index=True) if chunks else pd.DataFrame([])
+
+def scrape_doge_endpoint(api_root,endpoint_str,params,known_fps=None,page_ex=None,spill_dir=None,window=DOGE_PAGE_WINDOW):
+    # page 1 gives the page count. with a page executor the rest are fetched concurrently, at most window
+    # pages at a time, and each one goes to the sink as soon as it lands; with known_fps, pages are walked in
+    # order and paging stops after the first page made up only of records we already have. pages come
+    # newest first, so everything past that point has been seen before
+    url = os.path.join(api_root,endpoint_str)
+    sink = ChunkSink(os.path.join(spill_dir,endpoint_str) if spill_dir else None)
+    first_json = fetch_doge_page(url,{**params,"page":1})
+    n_pages = first_json['meta']['pages']
+    chunk, page_fps = page_to_chunk(first_json['result'][endpoint_str])
+    sink.add(chunk,1)
+    del first_json, chunk
+    if known_fps is None and page_ex is not None:
+        # the pool threads only download; each body is decoded and checked once, here, one page at a time
+        pending, next_page = {}, 2
+        while pending or next_page <= n_pages:
+            while next_page <= n_pages and len(pending) < window:
+                pending[page_ex.submit(fetch_doge_page,url,{**params,"page":next_page},raw=True)] = next_page
+                next_page += 1
+            done, _ = wait(pending,return_when=FIRST_COMPLETED)
+            for future in done:
+                page = pending.pop(future)
+                r, attempt = future.result()
+                try:
+                    page_json = check_doge_page(json.loads(r.content))
+                except Exception as e:
+                    if attempt == DOGE_RETRIES - 1:
+                        raise Exception(doge_page_error(url,{"page": page},e))
+                    pending[page_ex.submit(fetch_doge_page,url,{**params,"page":page},raw=True,attempt=attempt + 1)] = page
+                    continue
+                archive_body('doge',r.url,r.content)
+                chunk, _fps = page_to_chunk(page_json['result'][endpoint_str])
+                sink.add(chunk,page)
+                page_fps |= _fps
+                del r, page_json, chunk    # a spilled page is on disk now, don't keep it alive here until the next wait
+            del future, done
+    else:
+        page = 1
+        p_scrape = page < n_pages and not (known_fps is not None and page_fps <= known_fps)
+        while p_scrape:
+            page += 1
+            chunk, _fps = fetch_doge_chunk(url,{**params,"page":page},endpoint_str)
+            sink.add(chunk,page)
+            page_fps |= _fps
+            p_scrape = page < n_pages and not (known_fps is not None and _fps <= known_fps)
+    return sink.to_df(), page_fps
+
+def scrape_doge(incremental=False,state={},max_workers=DOGE_WORKERS,spill_dir=None,endpoints=('contracts','grants','leases')):
+    api_root = DOGE_API_ROOT
     params = {
         "sort_by": "date",
         "sort_order": "desc",
-        "per_page": 500
+        "per_page": DOGE_PER_PAGE
     }
-    contract_df = scrape_doge_endpoint(api_root,'contracts',params)
-    grant_df = scrape_doge_endpoint(api_root,'grants',params)
-    property_df = scrape_doge_endpoint(api_root,'leases',params)
-    return contract_df, grant_df, property_df
+    now = datetime.now()
+    known_fps_list = []
+    for endpoint_str in endpoints:
+        last_full = state.get(endpoint_str,{}).get('last_full_sync')
+        do_incremental = incremental and last_full is not None and \
+            now - datetime.fromisoformat(last_full) < timedelta(days=FULL_RESYNC_DAYS)
+        known_fps_list.append(set(state[endpoint_str].get('fingerprints',[])) if do_incremental else None)
+    # endpoints run side by side; their later pages share one pool, and the api.doge.gov token bucket
+    with ThreadPoolExecutor(max_workers=max_workers) as page_ex, ThreadPoolExecutor(max_workers=len(endpoints)) as ep_ex:
+        futures = [ep_ex.submit(scrape_doge_endpoint,api_root,endpoint_str,params,known_fps,page_ex,spill_dir,2 * max_workers)
+            for endpoint_str, known_fps in zip(endpoints,known_fps_list)]
+        results = [f.result() for f in futures]
+    dfs, new_state, incremental_used = [], dict(state), []   # endpoints not scraped keep their state
+    for endpoint_str, known_fps, (df, page_fps) in zip(endpoints,known_fps_list,results):
+        do_incremental = known_fps is not None
+        new_state[endpoint_str] = {
+            'fingerprints': sorted(known_fps | page_fps) if do_incremental else sorted(page_fps),
+            'last_full_sync': state[endpoint_str]['last_full_sync'] if do_incremental else now.isoformat(timespec='seconds'),
+        }
+        dfs.append(df)
+        incremental_used.append(do_incremental)
+    return dfs, new_state, incremental_used
 
 def dollar_str_to_float(dstr):
     return float(dstr.replace('$','').replace(',',''))
@@ -137,6 +1237,30 @@ def safe_to_dt(dtstr):
         dt = None
     return dt
 
+def to_dt_col(s,redetect=True):
+    # one cached strptime format for the whole column; whatever it misses goes through safe_to_dt as before
+    fmt = date_format_cache.get(s.name)
+    if fmt is not None and redetect:
+        # the same column name can arrive in another format (raw FPDS text vs a saved table), detect again
+        sample = s.dropna().head(1000)
+        sample = sample[sample.astype(str) != '']
+        if len(sample) and pd.to_datetime(sample,format=fmt,errors='coerce').notna().mean() <= 0.9:
+            del date_format_cache[s.name]
+            return to_dt_col(s,redetect=False)
+    if fmt is None:
+        sample = s.dropna()
+        sample = sample[sample.astype(str) != ''].head(1000)
+        hits = {_fmt: pd.to_datetime(sample,format=_fmt,errors='coerce').notna().mean() for _fmt in DATE_FORMATS} if len(sample) else {}
+        if hits and max(hits.values()) > 0.9:
+            fmt = date_format_cache[s.name] = max(hits,key=hits.get)
+    dt = pd.to_datetime(s,format=fmt,errors='coerce') if fmt else pd.Series(pd.NaT,index=s.index,dtype='datetime64[us]')
+    miss = dt.isna() & s.notna() & (s.astype(str) != '')
+    if miss.any():
+        dt = dt.astype(object)
+        dt[miss] = [safe_to_dt(dts) for dts in s[miss].values]
+        dt = pd.Series(list(dt.values),index=s.index,name=s.name)
+    return dt
+
 def df_row_diff(old_df,new_df):
     return pd.concat([old_df,new_df])[new_df.columns].drop_duplicates(keep=False)
 
@@ -150,25 +1274,87 @@ def df_row_diff_2(old_df,stub_df):
             new_df = new_df.drop(idx,axis=0)
     return new_df, drop_idx
 
-def clean_stub_df(df):
+def fp_norm_val(v):
+    # NaN, None, NaT and '' all compare equal; 1 and 1.0 compare equal (csv round trips drop ints to floats)
+    if v is None or v is pd.NaT or v is pd.NA or (isinstance(v,(float,np.floating)) and np.isnan(v)):
+        return ''
+    if isinstance(v,(bool,np.bool_)):
+        return str(bool(v))
+    if isinstance(v,(int,float,np.integer,np.floating)):
+        return str(int(v)) if float(v).is_integer() else repr(float(v))
+    if isinstance(v,pd.Timestamp):
+        return 'T{}'.format(v.as_unit('ns').value)
+    return str(v)
+
+def fp_norm_col(s):
+    if isinstance(s.dtype,pd.CategoricalDtype):
+        # normalize each category once, then spread by code. -1 is a missing value
+        cats = np.append(fp_norm_col(pd.Series(s.cat.categories)).values.astype(object),'')
+        return pd.Series(cats[s.cat.codes.values],index=s.index,dtype=object)
+    if pd.api.types.is_datetime64_any_dtype(s):
+        ns = s.dt.as_unit('ns').astype('int64').astype(str)
+        return ('T' + ns).where(s.notna(),'').astype(object)
+    if pd.api.types.is_bool_dtype(s) or isinstance(s.dtype,pd.CategoricalDtype) or not pd.api.types.is_numeric_dtype(s):
+        if pd.api.types.infer_dtype(s,skipna=True) in ('string','empty'):
+            return s.astype(object).where(s.notna(),'')
+        return s.astype(object).map(fp_norm_val)
+    f = s.astype('float64')
+    out = pd.Series('',index=s.index,dtype=object)
+    integral = f.notna() & (f == np.floor(f)) & (f.abs() < 2**53)
+    out[integral] = f[integral].astype('int64').astype(str).astype(object)
+    frac = f.notna() & ~integral
+    out[frac] = f[frac].map(repr)
+    return out
+
+def fp_norm_df(df,cols):
+    return pd.DataFrame({c: fp_norm_col(df[c]) if c in df.keys() else pd.Series('',index=df.index,dtype=object) for c in cols},index=df.index)
+
+def fp_hash(norm_df):
+    if len(norm_df) == 0:
+        return np.array([],dtype=np.uint64)
+    return pd.util.hash_pandas_object(norm_df,index=False).values
+
+def row_fingerprint(df,cols):
+    # stable 64-bit hash over the normalized values of cols, one per row
+    return fp_hash(fp_norm_df(df,cols))
+
+def fp_match(old_fp,new_fp):
+    # sort-based hash index: each new fingerprint resolves to a (possibly empty) run of old positions
+    order = np.argsort(old_fp,kind='stable')
+    return fp_lookup(old_fp[order],order,new_fp)
+
+def fp_lookup(sorted_fp,order,new_fp):
+    lo = np.searchsorted(sorted_fp,new_fp,side='left')
+    hi = np.searchsorted(sorted_fp,new_fp,side='right')
+    match = hi > lo
+    drop_idx = [np.asarray(order[l:h]) for l, h in zip(lo[match],hi[match])]
+    return match, drop_idx
+
+def df_row_diff_3(old_df,stub_df):
+    cols = list(stub_df.columns)
+    match, drop_idx = fp_match(row_fingerprint(old_df,cols),row_fingerprint(stub_df,cols))
+    return stub_df[~match].copy(), drop_idx
+
+def clean_stub_df(df,name=None):
     df.columns = [k.lower().replace(' ','_') for k in df.keys()]
     # in-column value replacement
     if 'uploaded_on' in df.keys():
-        df['uploaded_dt'] = [safe_to_dt(dts) for dts in df['uploaded_on'].values]
+        df['uploaded_dt'] = to_dt_col(df['uploaded_on']).values
     # column splitting and replacement
     if 'location' in df.keys():
-        loc_part_list = [loc.split(', ') for loc in df['location'].values]
-        for idx, loc_part_tup in enumerate(loc_part_list):
-            city_pred = len(loc_part_tup[1]) == 2
-            df.loc[idx,'city'] = loc_part_tup[0]    # city always first
-            df.loc[idx,'state'] = loc_part_tup[1] if city_pred else ''
-            if len(loc_part_tup) > 2:
-                df.loc[idx,'agency'] = loc_part_tup[2] if city_pred else loc_part_tup[1]
+        loc_parts = df['location'].str.split(', ',expand=True).reindex(columns=[0,1,2])
+        city_pred = loc_parts[1].str.len() == 2     # a 2-letter second part is a state code
+        df['city'] = loc_parts[0]   # city always first
+        df['state'] = loc_parts[1].where(city_pred,'')
+        has_agency = loc_parts[2].notna()
+        if has_agency.any():
+            agency = loc_parts[2].where(city_pred,loc_parts[1])
+            df['agency'] = agency.where(has_agency,df['agency']) if 'agency' in df.keys() else agency.where(has_agency)
     if 'link' in df.keys():
         df.link = df.link.fillna('')
     if 'vendor' in df.keys():
         df.loc[df.vendor == 'N/A','vendor'] = ''
-    return df
+    return apply_schema(df,name) if name is not None else df
 
 def parse_fpds_html(fpds_soup):
     data_dict = {}
@@ -181,85 +1367,690 @@ def parse_fpds_html(fpds_soup):
     data_dict['requirement_desc'] = None if req_desc_element is None else req_desc_element.get('text',default=None)
     return data_dict
 
+log_lock = threading.Lock()
+
+class FpdsTarget:
+    # lxml parser target: sees every start tag once in a single pass and never builds a tree
+    def __init__(self):
+        self.wanted = set(data_key_dict.values())
+        self.values = {}
+        self.req_desc = None
+        self.req_desc_found = False
+
+    def start(self,tag,attrib):
+        if tag == 'input':
+            qk = attrib.get('id')
+            if qk in self.wanted and qk not in self.values:   # first match wins, like soup.find
+                self.values[qk] = attrib.get('value')
+        elif tag == 'textarea' and not self.req_desc_found and attrib.get('id') == 'descriptionOfContractRequirement':
+            self.req_desc_found = True
+            self.req_desc = attrib.get('text')   # same attribute lookup as parse_fpds_html
+
+    def close(self):
+        data_dict = {}
+        for k, qk in data_key_dict.items():
+            data_dict[k] = self.values.get(qk)
+            if 'amount' in k and data_dict[k] is not None:
+                data_dict[k] = float(str(data_dict[k]).replace('$','').replace(',',''))
+        data_dict['requirement_desc'] = self.req_desc
+        return data_dict
+
+def parse_fpds_content(content):
+    # same output as parse_fpds_html(BeautifulSoup(content,features="lxml")) without the soup. lxml alone
+    # only knows a page's encoding from its meta tag, so try the encodings bs4 would, in the same order
+    if not content.strip():
+        return FpdsTarget().close()
+    detector = dammit.EncodingDetector(content,is_html=True)
+    for encoding in detector.encodings:
+        try:
+            return etree.fromstring(detector.markup,etree.HTMLParser(target=FpdsTarget(),encoding=encoding))
+        except (UnicodeDecodeError,LookupError,etree.ParserError):
+            continue
+    return etree.fromstring(content,etree.HTMLParser(target=FpdsTarget()))
+
 def log_row_error(mode,dt,req_url):
-    if not os.path.exists("./runlog"):
-        os.makedirs("./runlog")
-    with open(f"./runlog/scrape-{dt}.txt",'a') as lwf:
-        print(f"{mode},{dt},{req_url}",file=lwf)
+    with log_lock:
+        if not os.path.exists("./runlog"):
+            os.makedirs("./runlog")
+        with open(f"./runlog/scrape-{dt}.txt",'a') as lwf:
+            print(f"{mode},{dt},{req_url}",file=lwf)
+
+class Checkpoint:
+    # append-only JSONL journal of enriched rows, one line per finished fetch. the last line for a key
+    # wins, so a later success supersedes an earlier failure
+    def __init__(self,path,resume=False):
+        self.path = path
+        self.lock = threading.Lock()
+        self.entries = {}
+        if resume and os.path.exists(path):
+            with open(path) as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue    # torn last line from a crash
+                    self.entries[entry['key']] = entry
+        os.makedirs(os.path.dirname(path) or '.',exist_ok=True)
+        self.f = open(path,'a' if resume else 'w')
+
+    def done(self,key):
+        entry = self.entries.get(key)
+        return entry['record'] if entry is not None and entry['ok'] else None
+
+    def record(self,key,ok,record=None):
+        entry = {'key': key,'ok': ok,'record': record}
+        with self.lock:
+            self.entries[key] = entry
+            print(json.dumps(entry),file=self.f,flush=True)
+
+    def clear(self):
+        self.f.close()
+        os.remove(self.path)
 
-def extend_contract_data(contract_df,dt):
-    fpds_df = pd.DataFrame([])
+def checkpointed(mode,key,dt,checkpoint,fetch):
+    record = checkpoint.done(key) if checkpoint is not None else None
+    if record is not None:
+        return record
+    try:
+        record = fetch()
+    except:
+        log_row_error(mode,dt,key)
+        if checkpoint is not None:
+            checkpoint.record(key,False)
+        return None
+    if checkpoint is not None:
+        checkpoint.record(key,True,record)
+    return record
+
+def fetch_fpds_row(fpds_link,rh,dt,checkpoint=None):
+    if not validators.url(fpds_link):
+        return None
+    return checkpointed('contract',fpds_link,dt,checkpoint,lambda: parse_fpds_content(fetch_fpds_content(fpds_link,rh)))
+
+def fetch_fpds_content(fpds_link,rh):
+    r = cached_get(fpds_link,headers=rh)
+    if r.status_code != 200:    # an error page would parse as an all-empty row and be journaled as done
+        raise Exception('FPDS response: {}'.format(r.status_code))
+    archive_body('fpds',fpds_link,r.content)
+    return r.content
+
+def parse_fpds_batch(contents):
+    return [parse_fpds_content(c) for c in contents]
+
+def fetch_parse_fpds(links,rh,dt,max_workers=FPDS_WORKERS,parse_workers=1,checkpoint=None,batch_size=PARSE_BATCH):
+    # fetch threads put raw pages on a bounded queue and block while the parse processes are behind.
+    # rows are placed by position, so the output order matches links whatever order batches finish in
+    records = [None] * len(links)
+    pages = queue.Queue(maxsize=2 * parse_workers * batch_size)
+    def fetch(i,link):
+        if not validators.url(link):
+            return
+        records[i] = checkpoint.done(link) if checkpoint is not None else None
+        if records[i] is not None:
+            return
+        try:
+            content = fetch_fpds_content(link,rh)
+        except:
+            log_row_error('contract',dt,link)
+            if checkpoint is not None:
+                checkpoint.record(link,False)
+            return
+        pages.put((i,link,content))
+    def produce():
+        with ThreadPoolExecutor(max_workers=max_workers) as ex:
+            list(tqdm(ex.map(fetch,range(len(links)),links),total=len(links)))
+        pages.put(None)
+    def collect(batch,future):
+        try:
+            rows = future.result()
+        except:
+            rows = [None] * len(batch)
+        for (i, link, _), row in zip(batch,rows):
+            records[i] = row
+            if row is None:
+                log_row_error('contract',dt,link)
+            if checkpoint is not None:
+                checkpoint.record(link,row is not None,row)
+    with ProcessPoolExecutor(max_workers=parse_workers) as parse_ex:
+        parse_ex.submit(int).result()   # fork the workers now, before the fetch threads exist
+        producer = threading.Thread(target=produce,daemon=True)
+        producer.start()
+        batch, pending = [], deque()
+        while True:
+            item = pages.get()
+            if item is not None:
+                batch.append(item)
+            if batch and (item is None or len(batch) >= batch_size):
+                pending.append((batch,parse_ex.submit(parse_fpds_batch,[content for _, _, content in batch])))
+                batch = []
+            while pending and (item is None or len(pending) > 2 * parse_workers or pending[0][1].done()):
+                collect(*pending.popleft())
+            if item is None:
+                break
+        producer.join()
+    return records
+
+def fetch_usas_json(usas_req_url,rh):
+    r = cached_get(usas_req_url,headers=rh)
+    if r.status_code != 200:
+        raise Exception('API response: {}'.format(r.status_code))
+    record = r.json()
+    archive_body('usas',usas_req_url,r.content)
+    return record
+
+def fetch_usas_record(usas_req_url,rh,dt,checkpoint=None):
+    return checkpointed('grant',usas_req_url,dt,checkpoint,lambda: fetch_usas_json(usas_req_url,rh))
+
+def records_to_df(records,normalize=False):
+    # one row per record, None is an empty placeholder row so the axis=1 concat onto the stub rows stays aligned
+    records = [{} if r is None else r for r in records]
+    if normalize:
+        return pd.json_normalize(records,sep='_') if records else pd.DataFrame([])
+    return pd.DataFrame(records)
+
+def extend_contract_data(contract_df,dt,max_workers=FPDS_WORKERS,checkpoint=None,parse_workers=FPDS_PARSE_WORKERS):
     rh = req.utils.default_headers()
-    # this takes about 2s per iteration. Speedup without DOSing the FPDS server?
-    for fpds_link in tqdm(contract_df.fpds_link.values):
-        if validators.url(fpds_link):
-            try:
-                r = req.get(fpds_link,headers=rh)
-                contract_row_dict = parse_fpds_html(BeautifulSoup(r.content,features="lxml"))
-                fpds_df = pd.concat([fpds_df,pd.DataFrame(contract_row_dict,index=[0])],ignore_index=True)
-            except:
-                log_row_error('contract',dt,fpds_link)
-                fpds_df = pd.concat([fpds_df,pd.DataFrame([],index=[0])],ignore_index=True)
-        else:
-            fpds_df = pd.concat([fpds_df,pd.DataFrame([],index=[0])],ignore_index=True)
-    return pd.concat([contract_df.reset_index().drop('index',axis=1),fpds_df],axis=1)
+    # pages take about 2s each, so fetch a few at once. the per-host token bucket keeps FPDS from getting hammered
+    links = contract_df.fpds_link.values
+    if parse_workers:
+        contract_row_dicts = fetch_parse_fpds(links,rh,dt,max_workers,parse_workers,checkpoint)
+    else:
+        with ThreadPoolExecutor(max_workers=max_workers) as ex:
+            contract_row_dicts = list(tqdm(ex.map(lambda link: fetch_fpds_row(link,rh,dt,checkpoint),links),total=len(links)))
+    fpds_df = records_to_df(contract_row_dicts)
+    return apply_schema(pd.concat([contract_df.reset_index().drop('index',axis=1),fpds_df],axis=1),'contract')
 
-def extend_grant_data(grant_df,dt):
-    api_root = 'https://api.usaspending.gov/api/v2/awards/'
-    usas_df = pd.DataFrame([])
+def fetch_grant_record(link,rh,dt,checkpoint=None):
+    if not validators.url(link):
+        return None
+    return fetch_usas_record(os.path.join(USAS_API_ROOT,os.path.basename(link)),rh,dt,checkpoint)
+
+def extend_grant_data(grant_df,dt,max_workers=USAS_WORKERS,checkpoint=None):
+    # the award detail endpoint takes one id per call (the bulk search endpoints only return summary
+    # fields), so calls are spread over pooled keep-alive sessions and normalized together at the end
     rh = req.utils.default_headers()
-    for link in tqdm(grant_df.link.values):
-        if validators.url(link):
-            try:
-                grant_id = os.path.basename(link)
-                usas_req_url = os.path.join(api_root,grant_id)
-                r = limit_req(usas_req_url,headers=rh)
-                grant_row_df = pd.json_normalize(r.json(),sep='_')
-                grant_row_df = grant_row_df.rename(columns={'description': 'description_usas'})
-                usas_df = pd.concat([usas_df,grant_row_df],ignore_index=True)
-            except:
-                log_row_error('grant',dt,usas_req_url)
-                usas_df = pd.concat([usas_df,pd.DataFrame([],index=[0])],ignore_index=True)
+    links = grant_df.link.values
+    with ThreadPoolExecutor(max_workers=max_workers) as ex:
+        usas_records = list(tqdm(ex.map(lambda link: fetch_grant_record(link,rh,dt,checkpoint),links),total=len(links)))
+    usas_df = records_to_df(usas_records,normalize=True)
+    usas_df = usas_df.rename(columns={'description': 'description_usas'})
+    return apply_schema(pd.concat([grant_df.reset_index().drop('index',axis=1),usas_df],axis=1),'grant')
+
+def save_doge_data(contract_df, grant_df, property_df, stub_contract_df, stub_grant_df, stub_property_df, backend='csv', export_csv=True,
+    append=False):
+    tag = datetime.strftime(datetime.now(),'%Y-%m-%d-%H%M')
+    for df, name in zip([contract_df, grant_df, property_df],['contract','grant','property']):
+        if append and backend != 'cdc':
+            append_table(df,name,backend,export_csv,tag)
         else:
-            usas_df = pd.concat([usas_df,pd.DataFrame([],index=[0])],ignore_index=True)
-    return pd.concat([grant_df.reset_index().drop('index',axis=1),usas_df],axis=1)
-
-def save_doge_data(contract_df, grant_df, property_df, stub_contract_df, stub_grant_df, stub_property_df):
-    contract_df.to_csv('./data/doge-contract.csv',index=False)
-    grant_df.to_csv('./data/doge-grant.csv',index=False)
-    property_df.to_csv('./data/doge-property.csv',index=False)
-    stub_contract_df.to_csv('./data/doge-contract-stub.csv',index=False)
-    stub_grant_df.to_csv('./data/doge-grant-stub.csv',index=False)
-    stub_property_df.to_csv('./data/doge-property-stub.csv',index=False)
-
-def update_doge_data():
-    datetime_scrape = datetime.strftime(datetime.now(),'%Y-%m-%d-%H%M')
-    print('loading current data...')
-    pre_contract_df, pre_grant_df, pre_property_df = load_pre_data()
+            save_table(df,name,backend,export_csv,tag)
+    for stub_df, name in zip([stub_contract_df, stub_grant_df, stub_property_df],['contract','grant','property']):
+        save_stub(stub_df,name,backend,export_csv)
+
+def save_stub(stub_df,name,backend='csv',export_csv=True):
+    # stubs are snapshots of the current listing, rewritten in full whenever there is a full one
+    if stub_df is not None and (backend != 'cdc' or export_csv):   # the cdc current state stands in for the snapshots
+        stub_path = os.path.join(DATA_DIR,f'doge-{name}-stub.csv')
+        csv_frame(stub_df,name,stub_path).to_csv(stub_path,index=False)
+
+def open_checkpoints(resume=False,suffix='',modes=('contract','grant')):
+    return {mode: Checkpoint(os.path.join(CHECKPOINT_DIR,f'checkpoint-{mode}{suffix}.jsonl'),resume) for mode in modes}
+
+def retry_errors(log_path,dt,checkpoints):
+    # re-fetch only the rows in a log_row_error log; successes land in the checkpoint journal for a --resume run
+    rh = req.utils.default_headers()
+    fetchers = {'contract': fetch_fpds_row,'grant': fetch_usas_record}
+    with open(log_path) as f:
+        failed = [line.strip().split(',',2) for line in f if line.strip()]
+    failed = list(dict.fromkeys((mode,url) for mode, _, url in failed if mode in fetchers))
+    n_ok = 0
+    for mode, url in tqdm(failed):
+        n_ok += fetchers[mode](url,rh,dt,checkpoints[mode]) is not None
+    print(f'{n_ok} of {len(failed)} failed rows recovered')
+
+def export_as_of(when):
+    # the cdc tables as they stood at `when`, written to data/asof-<when>/, with every version up to then and
+    # the time span it was current in doge-<table>-history.csv
+    out_dir = os.path.join(DATA_DIR,'asof-' + pd.Timestamp(when).strftime('%Y-%m-%d-%H%M'))
+    os.makedirs(out_dir,exist_ok=True)
+    for name in ['contract','grant','property']:
+        events = cdc_events(name)
+        if events is not None:
+            csv_frame(cdc_current(events,as_of=when).drop(columns='_key'),name).to_csv(os.path.join(out_dir,f'doge-{name}.csv'),index=False)
+            history = cdc_history(events,as_of=when)
+            csv_frame(history[history._op != 'delete'].drop(columns='_op'),name).to_csv(
+                os.path.join(out_dir,f'doge-{name}-history.csv'),index=False)
+    return out_dir
+
+def combine_tables(pre_df,new_df,name,backend='csv',deleted=()):
+    # the csv and parquet histories append every new version, cdc keeps one current row per record
+    if backend == 'cdc':
+        return apply_schema(cdc_apply(pre_df,new_df,deleted),name)
+    return apply_schema(pd.concat([pre_df,new_df],ignore_index=True),name)  # concat drops mismatched categories
+
+def scrape_stubs(incremental=False,doge_workers=DOGE_WORKERS,spill_dir=None,tables=('contract','grant','property')):
     print('scraping new data...')
-    stub_contract_df, stub_grant_df, stub_property_df = scrape_doge()
-    stub_contract_df, stub_grant_df, stub_property_df = [clean_stub_df(df) for df in [stub_contract_df, stub_grant_df, stub_property_df]]
+    with run_metrics.stage('scrape'):
+        stub_dfs, scrape_state, incremental_used = scrape_doge(incremental,load_scrape_state(),doge_workers,spill_dir,
+            [TABLE_ENDPOINTS[name] for name in tables])
+    with run_metrics.stage('clean'):
+        stub_dfs = [clean_stub_df(df,name) for df, name in zip(stub_dfs,tables)]
+    return stub_dfs, scrape_state, incremental_used
+
+def diff_stub(pre_df,stub_df,name,backend='csv',incremental=False):
+    # new rows of one table, and for cdc the keys deleted upstream. without pre_df the csv/parquet
+    # history is diffed through its fingerprint index
+    if backend == 'cdc':
+        # changed records replace their previous version; deletes only count when the whole listing was scraped
+        new_df, deleted = cdc_split(pre_df,stub_df,name)
+        return new_df, () if incremental else deleted
+    if pre_df is None:
+        return df_row_diff_index(name,stub_df,backend)[0], ()
+    return df_row_diff_3(pre_df,stub_df)[0], ()
+
+def find_new_data(backend='csv',incremental=False,doge_workers=DOGE_WORKERS,spill_dir=None,append=False):
+    # with append, the csv/parquet history stays on disk and the diff runs against its fingerprint index.
+    # cdc always loads its current state, it diffs by record key
+    print('loading current data...')
+    with run_metrics.stage('load'):
+        pre_dfs = [None, None, None] if append and backend != 'cdc' else load_pre_data(backend)
+    stub_dfs, scrape_state, incremental_used = scrape_stubs(incremental,doge_workers,spill_dir)
     print('finding new and changed entries...')
-    (new_contract_df, contract_drop_idx), (new_grant_df, grant_drop_idx), (new_property_df, property_drop_idx) = [
-        df_row_diff_2(pre_df,stub_df) for pre_df, stub_df in zip(
-            [pre_contract_df,pre_grant_df,pre_property_df],[stub_contract_df, stub_grant_df, stub_property_df]
-        )
-    ] # dropped idx values are for debugging and tracking erroneously ejected "duplicate" entries.
-    print('extending contract table with FPDS data...')
-    new_contract_df = extend_contract_data(new_contract_df,datetime_scrape)
-    new_contract_df['dt_scrape'] = datetime_scrape
-    contract_df = pd.concat([pre_contract_df,new_contract_df],ignore_index=True)
-    print('extending grant table with USASpending data...')
-    new_grant_df = extend_grant_data(new_grant_df,datetime_scrape)
-    new_grant_df['dt_scrape'] = datetime_scrape
-    grant_df = pd.concat([pre_grant_df,new_grant_df],ignore_index=True)
-    new_property_df['dt_scrape'] = datetime_scrape
-    property_df = pd.concat([pre_property_df,new_property_df],ignore_index=True)
-    return contract_df, grant_df, property_df, stub_contract_df, stub_grant_df, stub_property_df
+    with run_metrics.stage('diff'):
+        new_dfs, deleted = zip(*[diff_stub(pre_df,stub_df,name,backend,inc) for pre_df, stub_df, name, inc in zip(
+            pre_dfs,stub_dfs,['contract','grant','property'],incremental_used)])
+    return pre_dfs, list(new_dfs), list(deleted), stub_dfs, scrape_state, incremental_used
+
+def enrich_table(df,name,dt,fpds_workers=FPDS_WORKERS,usas_workers=USAS_WORKERS,checkpoints={},parse_workers=FPDS_PARSE_WORKERS):
+    if name == 'contract':
+        print('extending contract table with FPDS data...')
+        with run_metrics.stage('contracts'):
+            return extend_contract_data(df,dt,max_workers=fpds_workers,checkpoint=checkpoints.get('contract'),parse_workers=parse_workers)
+    if name == 'grant':
+        print('extending grant table with USASpending data...')
+        with run_metrics.stage('grants'):
+            return extend_grant_data(df,dt,max_workers=usas_workers,checkpoint=checkpoints.get('grant'))
+    return df
+
+def enrich_new_data(new_contract_df,new_grant_df,new_property_df,dt,fpds_workers=FPDS_WORKERS,usas_workers=USAS_WORKERS,
+    checkpoints={},parse_workers=FPDS_PARSE_WORKERS):
+    new_dfs = [enrich_table(df,name,dt,fpds_workers,usas_workers,checkpoints,parse_workers)
+        for df, name in zip([new_contract_df, new_grant_df, new_property_df],['contract','grant','property'])]
+    for df in new_dfs:
+        df['dt_scrape'] = dt
+    return tuple(new_dfs)
+
+def update_doge_data(fpds_workers=FPDS_WORKERS,usas_workers=USAS_WORKERS,backend='csv',incremental=False,doge_workers=DOGE_WORKERS,
+    spill_dir=None,checkpoints={},parse_workers=FPDS_PARSE_WORKERS,append=False):
+    # with append, csv/parquet tables come back as just the new rows, for save_doge_data(...,append=True)
+    datetime_scrape = datetime.strftime(datetime.now(),'%Y-%m-%d-%H%M')
+    pre_dfs, new_dfs, deleted, stub_dfs, scrape_state, incremental_used = find_new_data(backend,incremental,doge_workers,spill_dir,append)
+    new_dfs = enrich_new_data(*new_dfs,datetime_scrape,fpds_workers,usas_workers,checkpoints,parse_workers)
+    contract_df, grant_df, property_df = [new_df if pre_df is None else combine_tables(pre_df,new_df,name,backend,dl)
+        for pre_df, new_df, name, dl in zip(pre_dfs,new_dfs,['contract','grant','property'],deleted)]
+    # an incremental scrape only sees the newest pages, so it can't replace the full stub snapshot
+    stub_contract_df, stub_grant_df, stub_property_df = [None if inc else df for df, inc in zip(stub_dfs,incremental_used)]
+    return contract_df, grant_df, property_df, stub_contract_df, stub_grant_df, stub_property_df, scrape_state
+
+def stage_path(fn):
+    return os.path.join(STAGE_DIR,fn)
+
+def read_stage_meta():
+    try:
+        with open(stage_path('scrape.json')) as f:
+            return json.load(f)
+    except OSError:
+        raise Exception('nothing staged, run the scrape stage first')
+
+def write_stage_meta(meta):
+    with open(stage_path('scrape.json'),'w') as f:
+        json.dump(meta,f)
+
+def read_stage_df(fn):
+    return pd.read_pickle(stage_path(fn + '.pkl')) if os.path.exists(stage_path(fn + '.pkl')) else None
+
+def write_stage_df(df,fn):
+    df.to_pickle(stage_path(fn + '.pkl'))
+
+def run_scrape_stage(tables=('contract','grant','property'),incremental=False,doge_workers=DOGE_WORKERS,spill_dir=None):
+    # the pipeline split into separately run stages, which hand over through STAGE_DIR. each stage only
+    # touches the tables the scrape picked up, so e.g. a leases refresh never waits on FPDS or USASpending
+    stub_dfs, scrape_state, incremental_used = scrape_stubs(incremental,doge_workers,spill_dir,tables)
+    if os.path.isdir(STAGE_DIR):
+        for fn in os.listdir(STAGE_DIR):   # rows staged by an earlier scrape belong to a different listing
+            os.remove(stage_path(fn))
+    os.makedirs(STAGE_DIR,exist_ok=True)
+    for df, name in zip(stub_dfs,tables):
+        write_stage_df(df,f'stub-{name}')
+    write_stage_meta({'dt_scrape': datetime.strftime(datetime.now(),'%Y-%m-%d-%H%M'),'tables': list(tables),
+        'incremental': dict(zip(tables,incremental_used)),'state': scrape_state,'deleted': {}})
+    print('staged {} listing rows'.format(', '.join(f'{len(df)} {name}' for df, name in zip(stub_dfs,tables))))
+
+def run_diff_stage(backend='csv'):
+    meta = read_stage_meta()
+    print('finding new and changed entries...')
+    with run_metrics.stage('diff'):
+        for name in meta['tables']:
+            pre_df = clean_pre_df(load_table(name,backend),name) if backend == 'cdc' else None
+            new_df, deleted = diff_stub(pre_df,read_stage_df(f'stub-{name}'),name,backend,meta['incremental'][name])
+            write_stage_df(new_df,f'new-{name}')
+            meta['deleted'][name] = [str(k) for k in deleted]
+            print(f'{len(new_df)} new {name} rows')
+    write_stage_meta(meta)
+
+def run_enrich_stage(name,fpds_workers=FPDS_WORKERS,usas_workers=USAS_WORKERS,checkpoints={},parse_workers=FPDS_PARSE_WORKERS):
+    meta = read_stage_meta()
+    new_df = read_stage_df(f'new-{name}')
+    if new_df is None:
+        raise Exception(f'no new {name} rows staged, run the diff stage first' if name in meta['tables'] else
+            f'the staged scrape has no {name} table')
+    write_stage_df(enrich_table(new_df,name,meta['dt_scrape'],fpds_workers,usas_workers,checkpoints,parse_workers),f'enriched-{name}')
+    if checkpoints.get(name) is not None:
+        checkpoints[name].clear()
+
+def run_save_stage(backend='csv',export_csv=True):
+    # staged rows are removed once saved, so running save twice doesn't append them twice. the scrape
+    # state is only saved once every staged table is, since it vouches for those records being on disk
+    meta = read_stage_meta()
+    tag = datetime.strftime(datetime.now(),'%Y-%m-%d-%H%M')
+    saved = meta.setdefault('saved',[])
+    with run_metrics.stage('save'):
+        for name in meta['tables']:
+            if name in saved:
+                continue
+            new_df = read_stage_df(f'new-{name}')
+            if new_df is None:
+                raise Exception(f'no new {name} rows staged, run the diff stage first')
+            df = read_stage_df(f'enriched-{name}') if name in ('contract','grant') else new_df
+            if df is None and len(new_df):
+                raise Exception(f'{len(new_df)} new {name} rows still need the enrich-{name}s stage')
+            df = new_df if df is None else df
+            df['dt_scrape'] = meta['dt_scrape']
+            if backend == 'cdc':
+                save_table(combine_tables(clean_pre_df(load_table(name,backend),name),df,name,backend,meta['deleted'].get(name,())),
+                    name,backend,export_csv,tag)
+            else:
+                append_table(df,name,backend,export_csv,tag)
+            if not meta['incremental'][name]:
+                save_stub(read_stage_df(f'stub-{name}'),name,backend,export_csv)
+            for fn in [f'new-{name}',f'enriched-{name}']:
+                if os.path.exists(stage_path(fn + '.pkl')):
+                    os.remove(stage_path(fn + '.pkl'))
+            saved.append(name)
+            write_stage_meta(meta)
+            print(f'saved {len(df)} new {name} rows')
+    save_scrape_state(meta['state'])
+
+def shard_arg(value):
+    try:
+        shard, n_shards = (int(v) for v in value.split('/'))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f'expected i/N, got {value!r}')
+    if not 0 <= shard < n_shards:
+        raise argparse.ArgumentTypeError(f'shard index must be in 0..{n_shards - 1}')
+    return shard, n_shards
+
+def shard_rows(df,name,shard,n_shards):
+    # rows are dealt out by record key, so every runner diffing the same listing agrees on the split.
+    # _pos keeps each row's place in the full diff for the merge
+    keys = df['_key'] if '_key' in df.keys() else record_keys(df,name)
+    pick = np.array([int(k,16) % n_shards for k in keys],dtype=np.int64) == shard
+    return df.assign(_pos=np.arange(len(df)))[pick]
+
+def shard_path(shard_dir,name,shard,n_shards):
+    return os.path.join(shard_dir,f'doge-{name}-{shard}of{n_shards}.csv')
+
+def shard_doge_data(shard,n_shards,shard_dir=SHARD_DIR,fpds_workers=FPDS_WORKERS,usas_workers=USAS_WORKERS,backend='csv',
+    incremental=False,doge_workers=DOGE_WORKERS,spill_dir=None,checkpoints={},parse_workers=FPDS_PARSE_WORKERS):
+    # enrich only this shard's share of the new rows into partial tables under shard_dir. data/ is left alone
+    # until merge_shards. the manifest goes last, so a shard that died partway counts as missing
+    datetime_scrape = datetime.strftime(datetime.now(),'%Y-%m-%d-%H%M')
+    _, new_dfs, deleted, _, _, _ = find_new_data(backend,incremental,doge_workers,spill_dir,append=True)
+    new_dfs = [shard_rows(df,name,shard,n_shards) for df, name in zip(new_dfs,['contract','grant','property'])]
+    stub_cols = {name: [c for c in df.keys() if c not in ('_key','_pos')] for df, name in zip(new_dfs,['contract','grant','property'])}
+    print(f'shard {shard}/{n_shards}: {", ".join(str(len(df)) for df in new_dfs)} new contract, grant and property rows')
+    new_dfs = enrich_new_data(*new_dfs,datetime_scrape,fpds_workers,usas_workers,checkpoints,parse_workers)
+    os.makedirs(shard_dir,exist_ok=True)
+    for df, name in zip(new_dfs,['contract','grant','property']):
+        csv_frame(df,name).to_csv(shard_path(shard_dir,name,shard,n_shards) + '.tmp',index=False)
+        os.replace(shard_path(shard_dir,name,shard,n_shards) + '.tmp',shard_path(shard_dir,name,shard,n_shards))
+    manifest = {'shard': shard,'n_shards': n_shards,'backend': backend,'dt_scrape': datetime_scrape,
+        'rows': {name: len(df) for df, name in zip(new_dfs,['contract','grant','property'])},'cols': stub_cols,
+        'deleted': {name: [str(k) for k in dl] for dl, name in zip(deleted,['contract','grant','property'])}}
+    manifest_path = os.path.join(shard_dir,f'shard-{shard}of{n_shards}.json')
+    with open(manifest_path + '.tmp','w') as f:
+        json.dump(manifest,f)
+    os.replace(manifest_path + '.tmp',manifest_path)
+    return manifest
+
+def read_shard_manifests(shard_dir):
+    manifests = {}
+    for fn in sorted(os.listdir(shard_dir)) if os.path.isdir(shard_dir) else []:
+        if fn.startswith('shard-') and fn.endswith('.json'):
+            with open(os.path.join(shard_dir,fn)) as f:
+                manifest = json.load(f)
+            manifests[(manifest['shard'],manifest['n_shards'])] = manifest
+    if not manifests:
+        raise Exception(f'no finished shards in {shard_dir}')
+    splits = {n for _, n in manifests}
+    if len(splits) > 1:
+        raise Exception(f'{shard_dir} mixes shards from different splits: {sorted(splits)}')
+    return {i: manifest for (i, _), manifest in manifests.items()}, splits.pop()
+
+def merge_shards(shard_dir=SHARD_DIR,backend='csv',export_csv=True):
+    # fold the finished shards' partial tables into data/, in the order of the full diff. merging again is a
+    # no-op, since rows whose listed values are already in data/ are skipped. rows of missing shards are
+    # still new to the next run's diff, so they get picked up then
+    manifests, n_shards = read_shard_manifests(shard_dir)
+    missing = [i for i in range(n_shards) if i not in manifests]
+    if missing:
+        print(f'shards missing or unfinished: {missing}')
+    if any(m['backend'] != backend for m in manifests.values()):
+        raise Exception(f'shards were diffed against a different --storage than {backend}')
+    pre_dfs = load_pre_data(backend) if backend == 'cdc' else [None, None, None]
+    tag = datetime.strftime(datetime.now(),'%Y-%m-%d-%H%M')
+    n_merged = {}
+    for pre_df, name in zip(pre_dfs,['contract','grant','property']):
+        # read as text, like the enriched rows were in memory; the schema types what needs typing
+        parts = [pd.read_csv(shard_path(shard_dir,name,i,n_shards),dtype=str) for i, m in sorted(manifests.items()) if m['rows'][name]]
+        if not parts:
+            n_merged[name] = 0
+            continue
+        new_df = pd.concat(parts,ignore_index=True)
+        new_df = new_df.iloc[np.argsort(new_df._pos.astype(int).values,kind='stable')].drop(columns='_pos').reset_index(drop=True)
+        new_df = clean_pre_df(new_df,name)
+        cols = next(m['cols'][name] for m in manifests.values() if m['rows'][name])
+        if pre_df is None:
+            match, _ = fp_index_match(name,new_df,cols,backend)
+        else:
+            match, _ = fp_match(row_fingerprint(pre_df,cols),row_fingerprint(new_df,cols))
+        new_df = new_df[~match]
+        deleted = sorted({k for m in manifests.values() for k in m['deleted'][name]})
+        n_merged[name] = len(new_df)
+        if pre_df is None:
+            append_table(new_df,name,backend,export_csv,tag)
+        elif len(new_df) or deleted:
+            save_table(combine_tables(pre_df,new_df,name,backend,deleted),name,backend,export_csv,tag)
+    print('merged {} of {} shards: {}'.format(len(manifests),n_shards,', '.join(f'{n} {name} rows' for name, n in n_merged.items())))
+    return n_merged, missing
+
+def reparse_batch(archive_dir,kind,entries):
+    # in a worker process: decompress each archived body and parse it the way a fresh fetch would be
+    fds, records = {}, []
+    try:
+        for entry in entries:
+            if entry['segment'] not in fds:
+                fds[entry['segment']] = os.open(os.path.join(archive_dir,entry['segment']),os.O_RDONLY)
+            body = decompress_frame(os.pread(fds[entry['segment']],entry['length'],entry['offset']),entry['codec'])
+            try:
+                records.append(parse_fpds_content(body) if kind == 'fpds' else json.loads(body))
+            except:
+                records.append(None)
+    finally:
+        [os.close(fd) for fd in fds.values()]
+    return records
+
+def reparse_links(links,kind,link_url,archive_dir=ARCHIVE_DIR,workers=None,batch_size=REPARSE_BATCH):
+    # link: record parsed from the newest archived body of each distinct link. links never archived are left out.
+    # bodies are read in segment order, batch_size at a time per worker process
+    index = read_archive_index(archive_dir)
+    todo = []
+    for link in dict.fromkeys(links):
+        entry = index.get(normalize_url(link_url(link))) if isinstance(link,str) and validators.url(link) else None
+        if entry is not None:
+            todo.append((link,entry))
+    todo.sort(key=lambda item: (item[1]['segment'],item[1]['offset']))
+    batches = [todo[i:i + batch_size] for i in range(0,len(todo),batch_size)]
+    parsed = {}
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count()) as ex:
+        futures = [ex.submit(reparse_batch,archive_dir,kind,[entry for _, entry in batch]) for batch in batches]
+        for batch, future in zip(batches,tqdm(futures)):
+            parsed.update((link,record) for (link, _), record in zip(batch,future.result()) if record is not None)
+    return parsed
+
+def reparse_table(df,name,archive_dir=ARCHIVE_DIR,workers=None):
+    # the contract table's FPDS columns or the grant table's USASpending columns, rebuilt from the archive with
+    # the current parser and data_key_dict. rows whose body was never archived keep their values
+    df = df.reset_index(drop=True)
+    if name == 'contract':
+        links = df.fpds_link
+        parsed = reparse_links(links.values,'fpds',lambda link: link,archive_dir,workers)
+        enrich_df = records_to_df([parsed.get(link) for link in links])
+    else:
+        links = df.link
+        parsed = reparse_links(links.values,'usas',lambda link: os.path.join(USAS_API_ROOT,os.path.basename(link)),archive_dir,workers)
+        enrich_df = records_to_df([parsed.get(link) for link in links],normalize=True).rename(columns={'description': 'description_usas'})
+    found = links.isin(list(parsed)).values
+    cols = list(df.columns)
+    at = cols.index('dt_scrape') if 'dt_scrape' in cols else len(cols)
+    cols = cols[:at] + [c for c in enrich_df if c not in cols] + cols[at:]   # new fields go where enrichment would put them
+    out = df.reindex(columns=cols)
+    for c in enrich_df:
+        out[c] = enrich_df[c].astype(object).where(found,out[c].astype(object))
+    return apply_schema(out,name), int(found.sum())
+
+def reparse_tables(backend='csv',export_csv=True,archive_dir=ARCHIVE_DIR,workers=None,tables=('contract','grant')):
+    # offline: nothing is fetched, the tables are rewritten in place
+    if not os.path.exists(os.path.join(archive_dir,'index.jsonl')):
+        raise Exception(f'no raw archive in {archive_dir}')
+    tag = datetime.strftime(datetime.now(),'%Y-%m-%d-%H%M')
+    for name in [name for name in tables if name in ('contract','grant')]:
+        df = clean_pre_df(load_table(name,backend),name)
+        if df.empty:
+            continue
+        print(f'reparsing the {name} table from {archive_dir}...')
+        with run_metrics.stage('contracts' if name == 'contract' else 'grants'):
+            df, n_found = reparse_table(df,name,archive_dir,workers)
+        with run_metrics.stage('save'):
+            save_table(df,name,backend,export_csv,tag,rewrite=True)
+        print(f'{name}: reparsed {n_found} of {len(df)} rows, {len(df) - n_found} had no archived body')
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='scrape DOGE savings data and extend it with FPDS/USASpending records')
+    parser.add_argument('stage',nargs='?',choices=CLI_STAGES,
+        help=f'run one stage, handing over to the next through {STAGE_DIR}/ (default: the whole pipeline in one go)')
+    parser.add_argument('--tables',nargs='+',choices=list(TABLE_ENDPOINTS),default=list(TABLE_ENDPOINTS),
+        help='with the scrape stage, only scrape these tables; the later stages follow')
+    parser.add_argument('--fpds-workers',type=int,default=FPDS_WORKERS,help='max in-flight FPDS requests')
+    parser.add_argument('--parse-workers',type=int,default=FPDS_PARSE_WORKERS,
+        help='processes parsing FPDS pages while the fetch threads keep downloading (0 parses in the fetch threads)')
+    parser.add_argument('--usas-workers',type=int,default=USAS_WORKERS,help='max in-flight USASpending award requests')
+    parser.add_argument('--doge-workers',type=int,default=DOGE_WORKERS,help='max in-flight DOGE savings API page requests')
+    parser.add_argument('--offline',action='store_true',help='serve FPDS/USASpending lookups from the local cache only')
+    parser.add_argument('--no-cache',action='store_true',help='skip the local FPDS/USASpending response cache')
+    parser.add_argument('--cache-path',default=CACHE_PATH)
+    parser.add_argument('--cache-ttl',type=float,default=CACHE_TTL_S,help='seconds before a cached response is revalidated')
+    parser.add_argument('--cache-max-bytes',type=int,default=CACHE_MAX_BYTES)
+    parser.add_argument('--spill-pages',action='store_true',help=f'write scraped pages to {PAGE_SPILL_DIR} as they arrive to bound memory')
+    parser.add_argument('--incremental',action='store_true',
+        help=f'stop paging at the first page of known records (full resync every {FULL_RESYNC_DAYS} days)')
+    parser.add_argument('--resume',action='store_true',help='reuse rows enriched by an interrupted run and retry only its failures')
+    parser.add_argument('--retry-errors',metavar='LOG',help='only re-fetch the rows listed in a runlog/scrape-*.txt error log, then exit')
+    parser.add_argument('--storage',choices=STORAGE_BACKENDS,default='csv',help='where the contract/grant/property history is kept')
+    parser.add_argument('--as-of',metavar='DATE',help='with --storage cdc, write the tables as they stood at DATE to data/asof-<date>/, then exit')
+    parser.add_argument('--shard',type=shard_arg,metavar='i/N',
+        help=f'enrich only shard i (0-based) of N of the new rows into partial tables under {SHARD_DIR}/, leaving data/ alone')
+    parser.add_argument('--merge-shards',metavar='DIR',help='merge the partial tables written by --shard runs into data/, then exit')
+    parser.add_argument('--reparse',action='store_true',
+        help='rebuild the FPDS/USASpending columns of the contract and grant tables (or --tables) from the raw archive, offline, then exit')
+    parser.add_argument('--reparse-workers',type=int,default=0,help='processes parsing archived bodies (0: one per core)')
+    parser.add_argument('--archive-dir',default=ARCHIVE_DIR,help='where raw DOGE/FPDS/USASpending responses are archived')
+    parser.add_argument('--no-archive',action='store_true',help="don't archive raw responses")
+    parser.add_argument('--no-csv-export',action='store_true',help="with --storage parquet or cdc, don't also write data/*.csv")
+    parser.add_argument('--profile',action='append',choices=PIPELINE_STAGES,default=[],metavar='STAGE',
+        help=f'run a stage under cProfile and write {RUNLOG_DIR}/profile-<stage>-<date>.prof (repeatable; one of {", ".join(PIPELINE_STAGES)})')
+    return parser.parse_args()
+
+def run_stage(args):
+    spill_dir = PAGE_SPILL_DIR if args.spill_pages else None
+    if args.stage == 'scrape':
+        run_scrape_stage(args.tables,args.incremental,args.doge_workers,spill_dir)
+    elif args.stage == 'diff':
+        run_diff_stage(args.storage)
+    elif args.stage in ('enrich-contracts','enrich-grants'):
+        name = args.stage.removeprefix('enrich-')[:-1]
+        run_enrich_stage(name,args.fpds_workers,args.usas_workers,open_checkpoints(args.resume,modes=[name]),args.parse_workers)
+    elif args.stage == 'save':
+        run_save_stage(args.storage,not args.no_csv_export)
+
+def startup_summary():
+    imports = ', '.join('{} {:.2f}s'.format(name,t) for name, t in sorted(import_times.items(),key=lambda kv: -kv[1]))
+    return 'startup {:.2f}s, imports: {}'.format(run_metrics.startup_s,imports or 'none')
 
 def main():
-    contract_df, grant_df, property_df, stub_contract_df, stub_grant_df, stub_property_df = update_doge_data()
-    save_doge_data(contract_df, grant_df, property_df, stub_contract_df, stub_grant_df, stub_property_df)
+    global http_cache, raw_archive, run_metrics
+    args = parse_args()
+    run_metrics = RunMetrics(profile_stages=args.profile)
+    run_metrics.startup_s = perf_counter() - T_START
+    if args.reparse:
+        reparse_tables(args.storage,not args.no_csv_export,args.archive_dir,args.reparse_workers or None,args.tables)
+        print('run report: ' + run_metrics.save(datetime.strftime(datetime.now(),'%Y-%m-%d-%H%M') + '-reparse'))
+        return
+    if not args.no_cache:
+        http_cache = HttpCache(args.cache_path,ttl=args.cache_ttl,max_bytes=args.cache_max_bytes,offline=args.offline)
+    if args.as_of:
+        print('written to ' + export_as_of(args.as_of))
+        return
+    if args.merge_shards:
+        with run_metrics.stage('save'):
+            merge_shards(args.merge_shards,backend=args.storage,export_csv=not args.no_csv_export)
+        return
+    if not args.no_archive:
+        raw_archive = RawArchive(args.archive_dir)
+    if args.stage:
+        run_stage(args)
+        print('run report: ' + run_metrics.save('{}-{}'.format(datetime.strftime(datetime.now(),'%Y-%m-%d-%H%M'),args.stage)))
+        print(startup_summary())
+        if raw_archive is not None:
+            print(raw_archive.summary())
+        return
+    checkpoints = open_checkpoints(resume=args.resume or args.retry_errors is not None,
+        suffix='-shard{}of{}'.format(*args.shard) if args.shard else '')
+    if args.retry_errors:
+        retry_errors(args.retry_errors,datetime.strftime(datetime.now(),'%Y-%m-%d-%H%M'),checkpoints)
+        return
+    if args.shard:
+        shard_doge_data(*args.shard,fpds_workers=args.fpds_workers,usas_workers=args.usas_workers,backend=args.storage,
+            incremental=args.incremental,doge_workers=args.doge_workers,spill_dir=PAGE_SPILL_DIR if args.spill_pages else None,
+            checkpoints=checkpoints,parse_workers=args.parse_workers)
+        for checkpoint in checkpoints.values():
+            checkpoint.clear()
+        print('run report: ' + run_metrics.save('{}-shard{}of{}'.format(datetime.strftime(datetime.now(),'%Y-%m-%d-%H%M'),*args.shard)))
+        return
+    contract_df, grant_df, property_df, stub_contract_df, stub_grant_df, stub_property_df, scrape_state = update_doge_data(
+        fpds_workers=args.fpds_workers,usas_workers=args.usas_workers,backend=args.storage,incremental=args.incremental,
+        doge_workers=args.doge_workers,spill_dir=PAGE_SPILL_DIR if args.spill_pages else None,checkpoints=checkpoints,
+        parse_workers=args.parse_workers,append=True)
+    with run_metrics.stage('save'):
+        save_doge_data(contract_df, grant_df, property_df, stub_contract_df, stub_grant_df, stub_property_df,
+            backend=args.storage,export_csv=not args.no_csv_export,append=True)
+    save_scrape_state(scrape_state)   # only once the records it vouches for are on disk
+    for checkpoint in checkpoints.values():
+        checkpoint.clear()
+    print('run report: ' + run_metrics.save(datetime.strftime(datetime.now(),'%Y-%m-%d-%H%M')))
+    print(startup_summary())
+    if raw_archive is not None:
+        print(raw_archive.summary())
 
 if __name__ == '__main__':
     main()
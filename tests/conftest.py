@@ -0,0 +1,25 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0,os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),'bench'))
+
+from common import load_scraper
+from mock_upstream import MockUpstream
+
+@pytest.fixture(scope='session')
+def ds():
+    return load_scraper()
+
+@pytest.fixture
+def srv(ds,monkeypatch):
+    # a fresh mock upstream with no client-side limit to speak of, and backoff short enough to retry in milliseconds
+    srv = MockUpstream(ds.data_key_dict).start()
+    monkeypatch.setitem(ds.HOST_RATES,srv.netloc,(1000.,1000))
+    monkeypatch.setattr(ds,'BACKOFF_S',0.01)
+    monkeypatch.setattr(ds,'DOGE_API_ROOT',srv.savings_root)
+    ds.host_limiters.clear()
+    yield srv
+    srv.stop()
+    ds.host_limiters.clear()
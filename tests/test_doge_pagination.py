@@ -0,0 +1,59 @@
+import os
+
+import pytest
+
+from synth import synth_savings_records
+
+ENDPOINTS = ['contracts','grants','leases']
+
+def test_fetch_doge_page_retries_500s(ds,srv):
+    records = synth_savings_records('contracts',25)
+    srv.savings = {'contracts': records}
+    srv.scripted.extend([500,503])
+    page = ds.fetch_doge_page(os.path.join(srv.savings_root,'contracts'),{'page': 1,'per_page': 10})
+    assert page['result']['contracts'] == records[:10]
+    assert srv.count_requests('/savings/contracts') == 3
+
+def test_fetch_doge_page_retries_truncated_json(ds,srv):
+    srv.savings = {'leases': synth_savings_records('leases',5)}
+    srv.scripted.extend(['bad_json','bad_json'])
+    page = ds.fetch_doge_page(os.path.join(srv.savings_root,'leases'),{'page': 1,'per_page': 10})
+    assert len(page['result']['leases']) == 5
+    assert srv.count_requests('/savings/leases') == 3
+
+def test_fetch_doge_page_backs_off_exponentially(ds,srv,monkeypatch):
+    srv.savings = {'grants': synth_savings_records('grants',5)}
+    srv.scripted.extend([500,'bad_json',500])
+    delays = []
+    monkeypatch.setattr(ds.random,'random',lambda: 0.5)    # no jitter
+    monkeypatch.setattr(ds,'sleep',delays.append)
+    ds.fetch_doge_page(os.path.join(srv.savings_root,'grants'),{'page': 1})
+    assert delays == [0.01,0.02,0.04]
+
+def test_fetch_doge_page_gives_up(ds,srv,monkeypatch):
+    monkeypatch.setattr(ds,'DOGE_RETRIES',3)
+    srv.savings = {'grants': synth_savings_records('grants',5)}
+    srv.scripted.extend([500] * 3)
+    with pytest.raises(Exception,match='failed after 3 attempts'):
+        ds.fetch_doge_page(os.path.join(srv.savings_root,'grants'),{'page': 1})
+
+def test_scrape_doge_pages_every_endpoint_in_order(ds,srv,monkeypatch):
+    monkeypatch.setattr(ds,'DOGE_PER_PAGE',10)
+    srv.savings = {endpoint: synth_savings_records(endpoint,n) for endpoint, n in zip(ENDPOINTS,[45,30,7])}
+    srv.scripted.extend([500,'bad_json',502,'bad_json'])   # land on whichever pages go first
+    dfs, state, incremental_used = ds.scrape_doge()
+    for endpoint, df in zip(ENDPOINTS,dfs):
+        key = {'contracts': 'piid','grants': 'link','leases': 'location'}[endpoint]
+        assert df[key].tolist() == [record[key] for record in srv.savings[endpoint]]
+    assert srv.count_requests('/savings/') == 5 + 3 + 1 + 4
+    assert incremental_used == [False] * 3 and all(len(state[endpoint]['fingerprints']) for endpoint in ENDPOINTS)
+
+def test_scrape_doge_decodes_each_page_once(ds,srv,monkeypatch):
+    decoded = []
+    loads = ds.json.loads   # Response.json decodes through json.loads too
+    monkeypatch.setattr(ds.json,'loads',lambda body, **kw: decoded.append(len(body)) or loads(body,**kw))
+    monkeypatch.setattr(ds,'DOGE_PER_PAGE',10)
+    srv.savings = {endpoint: synth_savings_records(endpoint,n) for endpoint, n in zip(ENDPOINTS,[45,30,7])}
+    srv.scripted.extend([500,'bad_json'])
+    ds.scrape_doge()
+    assert len(decoded) == 5 + 3 + 1 + 1    # every page once, plus the truncated body
@@ -0,0 +1,51 @@
+import os
+import shutil
+
+import pandas as pd
+import pytest
+
+from common import ROOT
+
+PROPERTY_CSV = os.path.join(ROOT,'data','doge-property.csv')
+
+@pytest.fixture
+def data_dir(tmp_path,monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    os.makedirs('data')
+    shutil.copy(PROPERTY_CSV,os.path.join('data','doge-property.csv'))
+    return tmp_path
+
+def stub_cols():
+    return [c for c in pd.read_csv(PROPERTY_CSV,nrows=0).columns if c != 'dt_scrape']
+
+def no_rebuild(*args,**kwargs):
+    raise AssertionError('index rebuilt from the whole history')
+
+def test_fresh_copy_keeps_the_index(ds,data_dir,monkeypatch):
+    ds.load_fp_index('property',stub_cols())
+    shutil.copy(PROPERTY_CSV,os.path.join('data','doge-property.csv.new'))
+    os.replace(os.path.join('data','doge-property.csv.new'),os.path.join('data','doge-property.csv'))
+    monkeypatch.setattr(ds,'build_fp_index',no_rebuild)
+    assert ds.fp_index_meta('property') is not None
+
+def test_rows_appended_elsewhere_catch_up(ds,data_dir,monkeypatch):
+    cols = stub_cols()
+    ds.load_fp_index('property',cols)
+    with open(PROPERTY_CSV) as f:
+        lines = f.read().splitlines(keepends=True)
+    with open(os.path.join('data','doge-property.csv'),'a') as f:   # e.g. a pulled commit of a later run
+        f.writelines(lines[1:4])
+    monkeypatch.setattr(ds,'build_fp_index',no_rebuild)
+    sorted_fp, _ = ds.load_fp_index('property',cols)
+    assert len(sorted_fp) == len(lines) + 2
+    full = ds.clean_pre_df(pd.read_csv(os.path.join('data','doge-property.csv'),dtype=str),'property')
+    match, _ = ds.fp_index_match('property',full.tail(3)[cols],cols)
+    assert match.all()
+
+def test_rewrite_drops_the_index(ds,data_dir):
+    cols = stub_cols()
+    ds.load_fp_index('property',cols)
+    df = ds.clean_pre_df(ds.load_table('property'),'property')
+    df.loc[len(df) // 2,'city'] = df.loc[len(df) // 2 + 1,'city']    # same length, mid-file
+    ds.save_table(df,'property')
+    assert ds.fp_index_meta('property') is None
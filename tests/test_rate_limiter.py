@@ -0,0 +1,88 @@
+import threading
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+from time import monotonic
+
+import pytest
+
+def test_parse_retry_after(ds):
+    assert ds.parse_retry_after(None) is None
+    assert ds.parse_retry_after('') is None
+    assert ds.parse_retry_after('soon') is None
+    assert ds.parse_retry_after('2') == 2.
+    assert ds.parse_retry_after('0.5') == 0.5
+    assert ds.parse_retry_after('-3') == 0.
+    assert ds.parse_retry_after('1e9') == ds.MAX_RETRY_AFTER_S
+
+def test_parse_retry_after_http_date(ds):
+    now = datetime.now(timezone.utc)
+    assert ds.parse_retry_after(format_datetime(now + timedelta(seconds=30),usegmt=True)) == pytest.approx(30,abs=2)
+    assert ds.parse_retry_after(format_datetime(now - timedelta(seconds=30),usegmt=True)) == 0.
+
+def test_429_halves_the_rate_once_per_cut_interval(ds):
+    limiter = ds.HostLimiter(10,10,min_rate=2)
+    for _ in range(3):  # a burst of 429s from requests already in flight is one signal
+        limiter.acquire()
+        limiter.release(429,0.01)
+    assert limiter.rate == 5
+    limiter.t_cut -= limiter.cut_interval_s
+    limiter.acquire()
+    limiter.release(503,0.01)
+    assert limiter.rate == 2.5
+    limiter.t_cut -= limiter.cut_interval_s
+    limiter.acquire()
+    limiter.release(429,0.01)
+    assert limiter.rate == 2   # never below min_rate
+
+def test_slow_responses_trim_the_rate(ds):
+    limiter = ds.HostLimiter(10,10,latency_target=0.5)
+    limiter.acquire()
+    limiter.release(200,1.)
+    assert limiter.rate == pytest.approx(9)
+
+def test_successes_raise_the_rate_additively(ds):
+    limiter = ds.HostLimiter(10,10_000,min_rate=1,max_rate=20)  # a burst big enough that acquire never waits
+    for _ in range(10):  # one second's worth of requests at 10/s adds about one step
+        limiter.acquire()
+        limiter.release(200,0.01)
+    assert limiter.rate == pytest.approx(10 + limiter.step,rel=0.01)
+    for _ in range(2000):
+        limiter.acquire()
+        limiter.release(200,0.01)
+    assert limiter.rate == 20   # capped at max_rate
+
+def test_retry_after_pauses_the_host(ds):
+    limiter = ds.HostLimiter(1000,1000)
+    limiter.acquire()
+    limiter.release(429,0.01,retry_after=0.2)
+    t0 = monotonic()
+    limiter.acquire()
+    assert monotonic() - t0 >= 0.19
+    limiter.release(200,0.01)
+
+def test_inflight_cap(ds):
+    limiter = ds.HostLimiter(1000,1000,max_inflight=2)
+    limiter.acquire()
+    limiter.acquire()
+    third = threading.Thread(target=limiter.acquire)
+    third.start()
+    third.join(0.1)
+    assert third.is_alive()
+    limiter.release(200,0.01)
+    third.join(1)
+    assert not third.is_alive()
+
+def test_polite_get_waits_out_retry_after(ds,srv):
+    srv.retry_after = 0.3
+    srv.scripted.extend([429])
+    url = srv.root + '/fpds/P1'
+    t0 = monotonic()
+    r = ds.polite_get(url)
+    assert r.status_code == 200 and monotonic() - t0 >= 0.29
+    assert srv.count_requests('/fpds/') == 2
+    assert ds.host_limiter(url).rate < 1000
+
+def test_polite_get_returns_the_last_error(ds,srv):
+    srv.scripted.extend([503] * 3)
+    r = ds.polite_get(srv.root + '/fpds/P1',retries=2)
+    assert r.status_code == 503 and srv.count_requests('/fpds/') == 3
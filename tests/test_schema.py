@@ -0,0 +1,79 @@
+import os
+import shutil
+import subprocess
+import sys
+
+import pandas as pd
+import pytest
+
+from common import ROOT
+from synth import synth_fpds_html
+
+PROPERTY_CSV = os.path.join(ROOT,'data','doge-property.csv')
+CONTRACT_CSV = os.path.join(ROOT,'.old','data','doge-contract.csv')
+
+@pytest.fixture
+def data_dir(tmp_path,monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    os.makedirs('data')
+    shutil.copy(PROPERTY_CSV,os.path.join('data','doge-property.csv'))
+    return tmp_path
+
+def read_bytes(path):
+    with open(path,'rb') as f:
+        return f.read()
+
+def test_full_rewrite_is_byte_identical(ds,data_dir):
+    df = ds.clean_pre_df(ds.load_table('property'),'property')
+    assert pd.api.types.is_datetime64_any_dtype(df['date'])   # typed in memory
+    ds.save_table(df,'property')
+    assert read_bytes('data/doge-property.csv') == read_bytes(PROPERTY_CSV)
+
+def test_append_keeps_the_source_date_text(ds,data_dir):
+    stub = ds.clean_stub_df(pd.read_csv(PROPERTY_CSV,dtype=str,nrows=2).drop(columns='dt_scrape'),'property')
+    ds.append_table(stub.assign(dt_scrape='2025-06-01-0000'),'property')
+    old, new = read_bytes(PROPERTY_CSV), read_bytes('data/doge-property.csv')
+    assert new.startswith(old)
+    assert [line.split(',')[0] for line in new[len(old):].decode().splitlines()] == ['3/13/2025','3/12/2025']
+
+def test_append_follows_the_csv_not_the_frame(ds,data_dir):
+    stub = ds.clean_stub_df(pd.read_csv(PROPERTY_CSV,dtype=str,nrows=1).drop(columns='dt_scrape'),'property')
+    stub.attrs.clear()    # parsed elsewhere: nothing known about the source text
+    ds.append_table(stub.assign(dt_scrape='2025-06-01-0000'),'property')
+    assert read_bytes('data/doge-property.csv').decode().splitlines()[-1].startswith('3/13/2025,')
+
+def in_fresh_process(code):
+    # a separate interpreter, like a pipeline stage run on its own
+    subprocess.run([sys.executable,'-c','import sys; sys.path.insert(0,{!r}); from common import load_scraper; ds = load_scraper()\n'.format(
+        os.path.join(ROOT,'bench')) + code],check=True)
+
+def test_staged_rows_append_in_the_source_text(data_dir):
+    in_fresh_process(f"""import os, pandas as pd
+os.makedirs(ds.STAGE_DIR)
+stub = ds.clean_stub_df(pd.read_csv({PROPERTY_CSV!r},dtype=str,nrows=2).drop(columns='dt_scrape'),'property')
+ds.write_stage_df(stub.assign(dt_scrape='2025-06-01-0000'),'new-property')""")
+    in_fresh_process("ds.append_table(ds.read_stage_df('new-property'),'property')")
+    old, new = read_bytes(PROPERTY_CSV), read_bytes('data/doge-property.csv')
+    assert [line.split(',')[0] for line in new[len(old):].decode().splitlines()] == ['3/13/2025','3/12/2025']
+
+def test_parquet_export_is_byte_identical(ds,data_dir):
+    pytest.importorskip('pyarrow')
+    ds.save_table(ds.clean_pre_df(ds.load_table('property','parquet'),'property'),'property','parquet')
+    os.remove('data/doge-property.csv')
+    ds.save_table(ds.clean_pre_df(ds.load_table('property','parquet'),'property'),'property','parquet')
+    assert read_bytes('data/doge-property.csv') == read_bytes(PROPERTY_CSV)
+
+def test_contract_listing_dates(ds,data_dir):
+    shutil.copy(CONTRACT_CSV,os.path.join('data','doge-contract.csv'))
+    df = ds.clean_pre_df(ds.load_table('contract'),'contract')
+    assert pd.api.types.is_datetime64_any_dtype(df['update_date'])
+    assert 'Termination in progress' in set(df['date'])   # notes in the listing date survive as text
+    ds.save_table(df,'contract')
+    old, new = [pd.read_csv(fp,dtype=str) for fp in [CONTRACT_CSV,'data/doge-contract.csv']]
+    pd.testing.assert_frame_equal(new[['date','update_date']],old[['date','update_date']])
+
+def test_fpds_dates_keep_their_padding(ds,data_dir):
+    row = ds.parse_fpds_content(synth_fpds_html('P1',ds.data_key_dict))
+    df = ds.apply_schema(pd.DataFrame([row]),'contract')
+    assert pd.api.types.is_datetime64_any_dtype(df['date_signed'])
+    assert ds.csv_frame(df,'contract')['date_signed'][0] == row['date_signed']